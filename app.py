@@ -7,6 +7,8 @@ from datetime import datetime
 import pytz
 import json
 
+from redis_client import make_redis_client
+
 app = Flask(__name__, template_folder="templates", static_folder="static")
 CORS(app)
 
@@ -38,26 +40,27 @@ def get_redis_credentials():
     return redis_url, token
 
 
-def save_opening_line(redis_url, headers, key, value):
-    url = f"{redis_url}/set/{key}"
-    payload = json.dumps({"value": value})
-    try:
-        res = requests.post(url, headers=headers, data=payload)
-        print(f"[Redis SET] {key} = {value} → {res.status_code}")
-    except Exception as e:
-        print("[Redis save error]", e)
+# Native RESP connection pool for a redis:// REDIS_URL, else the REST endpoint on a pooled session
+redis_client = make_redis_client(*get_redis_credentials())
+
 
+def get_or_set_opening_lines(entries):
+    """Record openings for many keys in one round trip and return what is stored.
 
-def batch_get_opening_lines(redis_url, headers, keys):
-    url = f"{redis_url}/mget"
+    `entries` is a list of (key, live_value). Keys with a live value are stored
+    only if new (SET NX GET), so concurrent workers all agree on the first
+    writer; keys without one are just read. The result is the stored JSON
+    string per key (our own payload where we won), or None on failure.
+    """
+    if not entries:
+        return []
     try:
-        payload = json.dumps(keys)
-        res = requests.post(url, headers=headers, data=payload)
-        if res.status_code == 200:
-            return res.json().get("result", [])
+        return redis_client.get_or_set_many(
+            [(key, None if value is None else json.dumps({"value": value})) for key, value in entries]
+        )
     except Exception as e:
-        print("[Redis batch get error]", e)
-    return [None] * len(keys)
+        print("[Redis get-or-set error]", e)
+    return [None] * len(entries)
 
 
 def to_american(decimal):
@@ -167,7 +170,7 @@ def odds(sport):
     if sport not in ALLOWED_SPORTS:
         return jsonify({"error": "Sport not supported"}), 400
 
-    if not redis_url or not redis_token:
+    if redis_client is None:
         return jsonify({"error": "Redis credentials not configured properly"}), 500
 
     data = get_odds_cached(sport, bookmaker, MARKETS)
@@ -178,6 +181,7 @@ def odds(sport):
     results = []
 
     redis_keys = []
+    live_values = []
     key_to_info = {}
 
     for game in data:
@@ -193,10 +197,13 @@ def odds(sport):
                     key_point = f"{sport}:{game['id']}:{market['key']}:{team}:open_point"
                     redis_keys.append(key_odds)
                     redis_keys.append(key_point)
+                    live_values.append(outcome.get("price"))
+                    live_values.append(outcome.get("point"))
                     key_to_info[key_odds] = (game, bm, market, outcome)
                     key_to_info[key_point] = (game, bm, market, outcome)
 
-    redis_results = batch_get_opening_lines(redis_url, redis_headers, redis_keys)
+    # Openings for every new key are stored, and existing ones read, in one call
+    redis_results = get_or_set_opening_lines(list(zip(redis_keys, live_values)))
     redis_values = dict(zip(redis_keys, redis_results))
 
     for game in data:
@@ -240,12 +247,11 @@ def odds(sport):
                         except Exception:
                             pass
 
+                    # Only when Redis was unreachable
                     if open_odds is None and live_decimal is not None:
-                        save_opening_line(redis_url, redis_headers, odds_key, live_decimal)
                         open_odds = live_decimal
 
                     if open_point is None and point is not None:
-                        save_opening_line(redis_url, redis_headers, point_key, point)
                         open_point = point
 
                     diff = "+0"
@@ -1,16 +1,41 @@
 import os
+import sys
 import json
 import time
+import math
+import random
+import hashlib
+import itertools
 import threading
+import queue
+import statistics
 import logging
-from datetime import datetime
-from typing import Any, Dict, Optional, List, Tuple
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, Optional, List, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:  # optional: batch line math falls back to pure Python
+    np = None
 
 import requests
 from requests.adapters import HTTPAdapter
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
 
+from redis_client import make_redis_client
+
 app = Flask(__name__, template_folder="templates", static_folder="static")
 CORS(app, resources={r"/*": {"origins": "*"}})
 
@@ -18,7 +43,7 @@ CORS(app, resources={r"/*": {"origins": "*"}})
 API_KEY = os.getenv("API_KEY")
 REGION = "us"
 ODDS_FORMAT = "american"
-CACHE_SECONDS = 60
+CACHE_SECONDS = int(os.getenv("CACHE_SECONDS", "60"))
 
 # Debug logging toggle
 OPENINGS_DEBUG = os.getenv("OPENINGS_DEBUG", "0") in ("1", "true", "True")
@@ -44,6 +69,8 @@ BOOKMAKERS = [
     "wynnbet",
 ]
 MARKETS = ["h2h", "spreads", "totals"]
+# Fetch all BOOKMAKERS in one upstream call per sport and split it per book
+MULTI_BOOK_FETCH = os.getenv("MULTI_BOOK_FETCH", "1") in ("1", "true", "True")
 
 # -------- Logging --------
 logging.basicConfig(level=logging.INFO)
@@ -63,22 +90,156 @@ HTTP.mount("https://", HTTPAdapter(pool_connections=50, pool_maxsize=50))
 HTTP.mount("http://", HTTPAdapter(pool_connections=50, pool_maxsize=50))
 
 # -------- Simple in-proc cache --------
+# "swr": past CACHE_SECONDS an entry is still served for up to STALE_SECONDS
+# while one background refresh runs; "strict": expired entries are refetched inline.
+CACHE_MODE = os.getenv("CACHE_MODE", "swr")
+STALE_SECONDS = int(os.getenv("STALE_SECONDS", "600"))
+# Memory cap: least recently used entries are evicted past CACHE_MAX_BYTES
+# (serialized size, approximate) or CACHE_MAX_ENTRIES
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "2048"))
+
+def _approx_size(data: Any) -> int:
+    try:
+        return len(json.dumps(data, separators=(",", ":"), ensure_ascii=False))
+    except (TypeError, ValueError):
+        return sys.getsizeof(data)
+
+class LRUCache:
+    """Cache entries ({"data", "ts", "ver", "ttl", "size"}) in least-recently-used
+    order, held under max_bytes / max_entries. Entries older than ttl +
+    STALE_SECONDS can never be served again and are dropped when looked up.
+    Not thread-safe on its own; callers hold _cache_lock."""
+    def __init__(self, max_bytes: int, max_entries: int, stats: Dict[str, int]):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.bytes = 0
+        self.stats = stats
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.time() - entry["ts"] > entry["ttl"] + STALE_SECONDS:
+            self.bytes -= self._entries.pop(key)["size"]
+            self.stats["expired"] += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.bytes -= old["size"]
+        self._entries[key] = entry
+        self.bytes += entry["size"]
+        # The entry just stored always stays, even if it alone exceeds the budget
+        while len(self._entries) > 1 and (self.bytes > self.max_bytes or len(self._entries) > self.max_entries):
+            _, evicted = self._entries.popitem(last=False)
+            self.bytes -= evicted["size"]
+            self.stats["evicted"] += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
 _cache_lock = threading.Lock()
-_cache: Dict[str, Dict[str, Any]] = {}
+_cache_stats = {"hit": 0, "miss": 0, "stale": 0, "coalesced": 0, "refresh_error": 0,
+                "shared_hit": 0, "shared_fill": 0, "shared_error": 0, "evicted": 0, "expired": 0}
+_cache = LRUCache(CACHE_MAX_BYTES, CACHE_MAX_ENTRIES, _cache_stats)
+# Every set_cache gets a new version, so derived views can tell when their input changed
+_versions = itertools.count(1)
 def get_cache(key: str):
     with _cache_lock:
         entry = _cache.get(key)
         if not entry: return None
-        if time.time() - entry["ts"] > CACHE_SECONDS: return None
+        if time.time() - entry["ts"] > entry["ttl"]: return None
         return entry["data"]
-def set_cache(key: str, data: Any):
+def set_cache(key: str, data: Any, ttl: Optional[float] = None, ts: Optional[float] = None,
+              size: Optional[int] = None):
+    if size is None:
+        size = _approx_size(data)
     with _cache_lock:
-        _cache[key] = {"data": data, "ts": time.time()}
+        _cache.put(key, {"data": data, "ts": time.time() if ts is None else ts, "ver": next(_versions),
+                         "ttl": CACHE_SECONDS if ttl is None else ttl, "size": size})
+def get_cache_entry(key: str) -> Optional[Dict[str, Any]]:
+    """Raw entry (data, ts, ver, ttl, size) whether fresh or stale, unless evicted."""
+    with _cache_lock:
+        return _cache.get(key)
+
+class _Flight:
+    """One in-progress load for a cache key; concurrent callers wait on it."""
+    def __init__(self):
+        self.done = threading.Event()
+        self.data = None
+        self.error: Optional[BaseException] = None
+
+_inflight: Dict[str, _Flight] = {}
+
+def _run_flight(key: str, flight: _Flight, loader, background: bool = False, ttl=None, shared: bool = False):
+    try:
+        if shared and _shared_cache is not None:
+            flight.data, ts, lifetime = shared_fill(key, loader, ttl)
+            set_cache(key, flight.data, lifetime, ts)
+        else:
+            flight.data = loader()
+            set_cache(key, flight.data, ttl(flight.data) if ttl else None)
+    except Exception as e:
+        flight.error = e
+        if background:
+            with _cache_lock:
+                _cache_stats["refresh_error"] += 1
+            log.warning("background refresh of %s failed: %s", key, e)
+    finally:
+        with _cache_lock:
+            _inflight.pop(key, None)
+        flight.done.set()
+
+def cached_fetch(key: str, loader, wait_timeout: float = 30.0, ttl=None, shared: bool = False) -> Any:
+    """get_cache/set_cache around `loader` with single-flight loads and,
+    in "swr" mode, stale-while-revalidate. `ttl(data)`, if given, picks the
+    lifetime of each loaded value (default CACHE_SECONDS). With `shared`, loads
+    go through the cross-worker tier (shared_fill) instead of straight to `loader`."""
+    with _cache_lock:
+        entry = _cache.get(key)
+        age = time.time() - entry["ts"] if entry else None
+        if entry and age <= entry["ttl"]:
+            _cache_stats["hit"] += 1
+            return entry["data"]
+        flight = _inflight.get(key)
+        if entry and CACHE_MODE == "swr" and age <= entry["ttl"] + STALE_SECONDS:
+            _cache_stats["stale"] += 1
+            if flight is None:
+                flight = _inflight[key] = _Flight()
+                threading.Thread(target=_run_flight, args=(key, flight, loader, True, ttl, shared), daemon=True).start()
+            return entry["data"]
+        leader = flight is None
+        if leader:
+            _cache_stats["miss"] += 1
+            flight = _inflight[key] = _Flight()
+        else:
+            _cache_stats["coalesced"] += 1
+    if leader:
+        _run_flight(key, flight, loader, ttl=ttl, shared=shared)
+    elif not flight.done.wait(wait_timeout):
+        raise TimeoutError(f"timed out waiting for in-flight fetch of {key}")
+    if flight.error is not None:
+        raise flight.error
+    return flight.data
 
 # -------- Opening odds store (file + Redis SETNX) --------
 UPSTASH_URL = os.getenv("UPSTASH_REDIS_REST_URL")
 UPSTASH_TOKEN = os.getenv("UPSTASH_REDIS_REST_TOKEN")
+# A redis:// (or rediss://, unix://) REDIS_URL talks RESP over a connection pool;
+# without one (or without redis-py) the Upstash REST endpoint is used.
+REDIS_URL = os.getenv("REDIS_URL")
 ODDS_LOG_PATH = "odds_log.json"
+# "wal" appends new openings to odds_log.json.wal; "json" rewrites the whole file
+OPENINGS_BACKEND = os.getenv("OPENINGS_BACKEND", "wal")
+WAL_COMPACT_LINES = int(os.getenv("WAL_COMPACT_LINES", "2000"))
+# How often the shared store checks the backend for openings from other workers
+OPENINGS_REFRESH_SECONDS = float(os.getenv("OPENINGS_REFRESH_SECONDS", "1.0"))
+REDIS_MGET_CHUNK = 200
 
 _file_lock = threading.Lock()
 
@@ -99,62 +260,434 @@ def _save_file_dict(path: str, data: Dict[str, Any]):
             json.dump(data, f, ensure_ascii=False, indent=2)
         os.replace(tmp, path)
 
+@contextmanager
+def _flock(path: str, exclusive: bool = True, blocking: bool = True):
+    """Cross-process advisory lock on `path` (no-op where fcntl is unavailable).
+    Yields False if a non-blocking lock could not be taken."""
+    if fcntl is None:
+        yield True
+        return
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        flags = fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH
+        if not blocking:
+            flags |= fcntl.LOCK_NB
+        try:
+            fcntl.flock(fd, flags)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+    finally:
+        os.close(fd)
+
+def _file_sig(path: str) -> Optional[Tuple[int, int, int]]:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+def _replay_wal(path: str, data: Dict[str, Any]) -> int:
+    """Apply WAL lines onto `data` with first-writer-wins semantics.
+    A torn last line (crash mid-append) is skipped. Returns lines applied."""
+    if not os.path.exists(path):
+        return 0
+    n = 0
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                k, v = json.loads(line)
+            except Exception:
+                continue
+            data.setdefault(k, v)
+            n += 1
+    return n
+
+def _truncate_torn_tail(path: str):
+    """Cut a partial last line so later appends start on a clean line."""
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        if tail.endswith(b"\n"):
+            return
+        cut = tail.rfind(b"\n")
+        f.truncate(size - len(tail) + cut + 1 if cut >= 0 else max(0, size - len(tail)))
+
+class JsonFileBackend:
+    """Legacy backend: the whole odds_log.json is rewritten on every flush."""
+    def __init__(self, path: str):
+        self.path = path
+
+    rewrites_full = True
+
+    def load(self) -> Dict[str, Any]:
+        self.last_cursor = _file_sig(self.path)
+        return _load_file_dict(self.path)
+
+    def write(self, new_entries: Dict[str, Any], full: Dict[str, Any]):
+        _save_file_dict(self.path, full)
+
+    def tail(self, cursor):
+        # No change log to tail: any rewrite means a reload.
+        if _file_sig(self.path) == cursor:
+            return {}, cursor
+        return None, cursor
+
+class WalFileBackend:
+    """odds_log.json snapshot + append-only odds_log.json.wal of new openings.
+
+    Flushes append one JSON line per new key, so write cost scales with the
+    number of new openings. Once the WAL passes `compact_after` lines it is
+    folded into the snapshot on a background thread. At startup the snapshot
+    is loaded and any WAL (including one left mid-compaction) is replayed.
+    """
+    def __init__(self, path: str, compact_after: int = 2000):
+        self.path = path
+        self.wal_path = path + ".wal"
+        self.compacting_path = path + ".wal.compacting"
+        self.lock_path = path + ".lock"
+        self.compact_after = compact_after
+        # Lock order: the file locks are never waited on while holding _lock,
+        # which only guards the counters. _append_lock keeps this process's
+        # threads from interleaving lines and is taken inside the shared flock.
+        self._lock = threading.Lock()
+        self._append_lock = threading.Lock()
+        self._wal_lines = 0
+        self._compacting = False
+
+    rewrites_full = False
+
+    def load(self) -> Dict[str, Any]:
+        snap = _file_sig(self.path)
+        data = _load_file_dict(self.path)
+        with _flock(self.lock_path, exclusive=True):
+            _truncate_torn_tail(self.wal_path)
+            _replay_wal(self.compacting_path, data)
+            n = _replay_wal(self.wal_path, data)
+            wal = _file_sig(self.wal_path)
+        # Position for `tail`; a snapshot rewritten meanwhile forces a reload.
+        self.last_cursor = (snap, (wal[0], wal[2]) if wal else None)
+        with self._lock:
+            self._wal_lines = max(self._wal_lines, n)
+        return data
+
+    def write(self, new_entries: Dict[str, Any], full: Dict[str, Any]):
+        if not new_entries:
+            return
+        buf = "".join(
+            json.dumps([k, v], separators=(",", ":"), ensure_ascii=False) + "\n"
+            for k, v in new_entries.items()
+        )
+        with _flock(self.lock_path, exclusive=False), self._append_lock:
+            with open(self.wal_path, "a", encoding="utf-8") as f:
+                f.write(buf)
+                f.flush()
+                os.fsync(f.fileno())
+        with self._lock:
+            self._wal_lines += len(new_entries)
+            if self._wal_lines < self.compact_after or self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact_bg, daemon=True).start()
+
+    def tail(self, cursor):
+        """Entries appended to the WAL since `cursor` (see `load`), plus the new cursor.
+        Returns (None, cursor) when a compaction means the caller must reload."""
+        snap, wal = cursor if cursor else (None, None)
+        if _file_sig(self.path) != snap:
+            return None, cursor
+        cur = _file_sig(self.wal_path)
+        if cur is None:
+            return ({}, cursor) if wal is None else (None, cursor)
+        inode, offset = wal if wal else (cur[0], 0)
+        if cur[0] != inode:
+            return None, cursor
+        if cur[2] <= offset:
+            return {}, cursor
+        entries: Dict[str, Any] = {}
+        with open(self.wal_path, "rb") as f:
+            f.seek(offset)
+            chunk = f.read(cur[2] - offset)
+        end = chunk.rfind(b"\n") + 1
+        for line in chunk[:end].splitlines():
+            try:
+                k, v = json.loads(line)
+            except Exception:
+                continue
+            entries.setdefault(k, v)
+        return entries, (snap, (inode, offset + end))
+
+    def _compact_bg(self):
+        try:
+            self.compact()
+        except Exception as e:
+            log.warning("openings wal compaction failed: %s", e)
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self):
+        with _flock(self.lock_path + ".compact", blocking=False) as got:
+            if not got:
+                return
+            # Move the live WAL aside; appenders hold the shared lock.
+            with _flock(self.lock_path, exclusive=True):
+                if os.path.exists(self.wal_path):
+                    if os.path.exists(self.compacting_path):
+                        with open(self.wal_path, "r", encoding="utf-8") as src, \
+                                open(self.compacting_path, "a", encoding="utf-8") as dst:
+                            dst.write(src.read())
+                        os.remove(self.wal_path)
+                    else:
+                        os.replace(self.wal_path, self.compacting_path)
+            with self._lock:
+                self._wal_lines = 0
+            data = _load_file_dict(self.path)
+            n = _replay_wal(self.compacting_path, data)
+            _save_file_dict(self.path, data)
+            os.remove(self.compacting_path)
+            dlog("openings_wal_compacted", lines=n, keys=len(data))
+
+def make_openings_backend(kind: str, path: str):
+    if kind == "json":
+        return JsonFileBackend(path)
+    return WalFileBackend(path, compact_after=WAL_COMPACT_LINES)
+
+_openings_backend = make_openings_backend(OPENINGS_BACKEND, ODDS_LOG_PATH)
+
+_redis = make_redis_client(REDIS_URL or UPSTASH_URL, UPSTASH_TOKEN, fallback_url=UPSTASH_URL)
+
 def _redis_get(key: str) -> Optional[str]:
-    if not (UPSTASH_URL and UPSTASH_TOKEN):
+    if _redis is None:
         return None
     try:
-        r = HTTP.get(
-            f"{UPSTASH_URL}/get/{key}",
-            headers={"Authorization": f"Bearer {UPSTASH_TOKEN}"},
-            timeout=3,
-        )
-        if r.status_code == 404:
-            return None
-        r.raise_for_status()
-        j = r.json()
-        return j.get("result")
+        return _redis.get(key)
     except Exception as e:
         dlog("redis_get_error", key=key, error=str(e))
         return None
 
+def _redis_mget(keys: List[str]) -> Dict[str, Optional[str]]:
+    """MGET in chunks of REDIS_MGET_CHUNK keys; keys whose chunk failed are left out."""
+    out: Dict[str, Optional[str]] = {}
+    if _redis is None:
+        return out
+    for i in range(0, len(keys), REDIS_MGET_CHUNK):
+        chunk = keys[i:i + REDIS_MGET_CHUNK]
+        try:
+            out.update(zip(chunk, _redis.mget(chunk)))
+        except Exception as e:
+            dlog("redis_mget_error", size=len(chunk), error=str(e))
+    return out
+
+def _redis_pipeline(commands: List[List[Any]], transaction: bool = False) -> List[Dict[str, Any]]:
+    """Send commands in one round trip (Upstash /pipeline or /multi-exec, or a
+    native pipeline). Returns one {"result": ...} or {"error": ...} per command, in order."""
+    return _redis.pipeline(commands, transaction)
+
 # Async Redis writer
-_redis_queue: List[Tuple[str, str]] = []
+REDIS_BATCH_SIZE = 500
+REDIS_MAX_ATTEMPTS = 5
+# Past REDIS_QUEUE_MAX new writes and retries are dropped at once rather than
+# waited on (a Redis outage must not stall requests); the openings backend still
+# has them, and other workers read them from there.
+REDIS_QUEUE_MAX = int(os.getenv("REDIS_QUEUE_MAX", "20000"))
+
+_redis_queue: Deque[Tuple[str, str, int]] = deque()
 _redis_q_lock = threading.Lock()
 _redis_worker_started = False
+_redis_writer_stats = {"written": 0, "existed": 0, "retried": 0, "dropped": 0, "batches": 0}
+
+def _enqueue_redis_setnx(key: str, value: str) -> bool:
+    with _redis_q_lock:
+        if len(_redis_queue) >= REDIS_QUEUE_MAX:
+            _redis_writer_stats["dropped"] += 1
+            dlog("redis_queue_full_drop", key=key, depth=len(_redis_queue))
+            return False
+        _redis_queue.append((key, value, 0))
+        return True
+
+def _redis_setnx_batch(batch: List[Tuple[str, str, int]]) -> List[Tuple[str, str, int]]:
+    """SETNX a batch through one pipeline call. Returns the entries that failed."""
+    try:
+        results = _redis_pipeline([["SETNX", k, v] for k, v, _ in batch])
+    except Exception as e:
+        dlog("redis_pipeline_error", size=len(batch), error=str(e))
+        return batch
+    failed = []
+    for item, res in zip(batch, results):
+        if "error" in res:
+            dlog("redis_setnx_error", key=item[0], error=res["error"])
+            failed.append(item)
+        elif res.get("result") == 1:
+            _redis_writer_stats["written"] += 1
+        else:
+            _redis_writer_stats["existed"] += 1
+    return failed
 
 def _start_redis_worker():
     global _redis_worker_started
-    if _redis_worker_started or not (UPSTASH_URL and UPSTASH_TOKEN):
+    if _redis_worker_started or _redis is None:
         return
     _redis_worker_started = True
     def _worker():
+        backoff = 0.0
         while True:
             try:
                 with _redis_q_lock:
-                    batch = _redis_queue[:500]
-                    del _redis_queue[:500]
+                    batch = [_redis_queue.popleft() for _ in range(min(REDIS_BATCH_SIZE, len(_redis_queue)))]
                 if not batch:
                     time.sleep(0.5)
                     continue
-                for k, v in batch:
-                    try:
-                        url = f"{UPSTASH_URL}/setnx/{k}/{v}"
-                        r = HTTP.get(url, headers={"Authorization": f"Bearer {UPSTASH_TOKEN}"}, timeout=5)
-                        dlog("redis_setnx_attempt", key=k, status=r.status_code)
-                    except Exception as e:
-                        dlog("redis_setnx_error", key=k, error=str(e))
+                _redis_writer_stats["batches"] += 1
+                failed = _redis_setnx_batch(batch)
+                retry = [(k, v, n + 1) for k, v, n in failed if n + 1 < REDIS_MAX_ATTEMPTS]
+                if retry:
+                    with _redis_q_lock:
+                        retry = retry[:max(0, REDIS_QUEUE_MAX - len(_redis_queue))]
+                        _redis_queue.extend(retry)
+                    _redis_writer_stats["retried"] += len(retry)
+                _redis_writer_stats["dropped"] += len(failed) - len(retry)
+                backoff = min(max(backoff * 2, 0.5), 30.0) if failed else 0.0
+                if backoff:
+                    time.sleep(backoff)
             except Exception:
                 time.sleep(1.0)
     threading.Thread(target=_worker, daemon=True).start()
 
 _start_redis_worker()
 
+def parse_key(key: str) -> Optional[Tuple[str, str, str, str, str]]:
+    """Inverse of make_key: (sport, event_id, market, selection, bookmaker)."""
+    parts = key.split(":")
+    if len(parts) < 6 or parts[0] != "open":
+        return None
+    return parts[1], parts[2], parts[3], ":".join(parts[4:-1]), parts[-1]
+
 class OpeningsStore:
-    def __init__(self):
-        self._dict = _load_file_dict(ODDS_LOG_PATH)
-        self._dirty = False
+    """Process-wide openings map, loaded once and shared by all request threads.
+
+    Keys are also indexed sport -> event_id -> market -> bookmaker -> {selection: key}.
+    Openings written by other workers are picked up by tailing the backend's
+    change log (see `refresh`), checked at most every OPENINGS_REFRESH_SECONDS.
+    """
+    def __init__(self, backend=None):
+        self._backend = backend or _openings_backend
+        self._lock = threading.RLock()
+        self._dict: Dict[str, Any] = {}
+        self._index: Dict[str, Dict[str, Dict[str, Dict[str, Dict[str, str]]]]] = {}
+        self._pending: Dict[str, Any] = {}
+        # Keys a prefetch found absent in Redis too; get() skips the per-key GET for them
+        self._remote_misses: set = set()
+        # Bumped whenever a sport gains an opening; part of the /odds response version
+        self._sport_versions: Dict[str, int] = {}
+        self._cursor = None
+        self._last_refresh = 0.0
+        self._reload()
+
+    def _add(self, key: str, value: Any) -> bool:
+        if key in self._dict:
+            return False
+        self._dict[key] = value
+        self._remote_misses.discard(key)
+        parsed = parse_key(key)
+        if parsed:
+            sport, event_id, market, sel, bookmaker = parsed
+            (self._index.setdefault(sport, {}).setdefault(event_id, {})
+                .setdefault(market, {}).setdefault(bookmaker, {}))[sel] = key
+            self._sport_versions[sport] = self._sport_versions.get(sport, 0) + 1
+        return True
+
+    def _reload(self):
+        data = self._backend.load()
+        cursor = self._backend.last_cursor
+        with self._lock:
+            old = self._dict
+            self._dict, self._index = {}, {}
+            for k, v in data.items():
+                self._add(k, v)
+            for k, v in old.items():
+                self._add(k, v)
+            self._cursor = cursor
+        dlog("openings_reload", keys=len(data))
+
+    def refresh(self, force: bool = False):
+        now = time.time()
+        if not force and now - self._last_refresh < OPENINGS_REFRESH_SECONDS:
+            return
+        self._last_refresh = now
+        entries, cursor = self._backend.tail(self._cursor)
+        if entries is None:
+            self._reload()
+            return
+        with self._lock:
+            for k, v in entries.items():
+                self._add(k, v)
+            self._cursor = cursor
+
+    def sport_version(self, sport: str) -> int:
+        return self._sport_versions.get(sport, 0)
+
+    def __len__(self) -> int:
+        return len(self._dict)
+
+    def keys_for(self, sport: str, event_id: Optional[str] = None,
+                 market: Optional[str] = None, bookmaker: Optional[str] = None) -> List[str]:
+        with self._lock:
+            events = self._index.get(sport, {})
+            if event_id is not None:
+                events = {event_id: events.get(event_id, {})}
+            out = []
+            for markets in events.values():
+                for mk, books in markets.items():
+                    if market is not None and mk != market:
+                        continue
+                    for bk, sels in books.items():
+                        if bookmaker is not None and bk != bookmaker:
+                            continue
+                        out.extend(sels.values())
+            return out
+
+    def prefetch(self, keys: List[str]):
+        """Warm the local map for `keys` with chunked MGETs, so the
+        normalization pass that follows never does per-key Redis GETs."""
+        self.refresh()
+        missing = self.missing_keys(keys)
+        if not missing or _redis is None:
+            return
+        found = _redis_mget(missing)
+        self.absorb_remote(found)
+        dlog("openings_prefetch", keys=len(keys), missing=len(missing),
+             hits=sum(1 for v in found.values() if v is not None))
+
+    def missing_keys(self, keys: List[str]) -> List[str]:
+        """Keys not held locally and not already known to be absent remotely."""
+        with self._lock:
+            return [k for k in dict.fromkeys(keys) if k not in self._dict and k not in self._remote_misses]
+
+    def absorb_remote(self, found: Dict[str, Optional[str]]):
+        """Merge raw MGET results; None marks a key as absent remotely."""
+        with self._lock:
+            for k, raw in found.items():
+                if raw is None:
+                    self._remote_misses.add(k)
+                    continue
+                try:
+                    self._add(k, json.loads(raw))
+                except Exception:
+                    self._remote_misses.add(k)
 
     def get(self, key: str) -> Optional[Dict[str, Any]]:
+        self.refresh()
         raw = self._dict.get(key)
         if raw:
             if isinstance(raw, str):
@@ -166,64 +699,597 @@ class OpeningsStore:
                 opening = raw
             return opening
 
+        if key in self._remote_misses:
+            return None
         raw_redis = _redis_get(key)
         if raw_redis:
             try:
                 parsed = json.loads(raw_redis)
-                self._dict[key] = parsed
-                return parsed
+                with self._lock:
+                    self._add(key, parsed)
+                return self._dict.get(key)
             except:
                 return None
         return None
 
     def setnx(self, key: str, payload: Dict[str, Any]):
-        if key in self._dict:
-            return
-        self._dict[key] = payload
-        self._dirty = True
+        with self._lock:
+            if not self._add(key, payload):
+                return
+            self._pending[key] = payload
         try:
-            if UPSTASH_URL and UPSTASH_TOKEN:
+            if _redis is not None:
                 v = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
-                with _redis_q_lock:
-                    _redis_queue.append((key, v))
+                _enqueue_redis_setnx(key, v)
         except Exception as e:
             dlog("opening_setnx_queue_error", key=key, error=str(e))
 
     def flush_if_needed(self):
-        if self._dirty:
-            _save_file_dict(ODDS_LOG_PATH, self._dict)
-            self._dirty = False
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, {}
+            full = dict(self._dict) if self._backend.rewrites_full else self._dict
+        self._backend.write(pending, full)
+
+_store: Optional[OpeningsStore] = None
+_store_lock = threading.Lock()
+
+def get_openings_store() -> OpeningsStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = OpeningsStore()
+    return _store
+
+# -------- Commence-time TTLs --------
+# How long odds stay fresh depends on how soon the next game starts:
+# ODDS_TTL_TIERS is "lead_seconds:ttl_seconds,..." — the first tier whose lead
+# covers the time to kickoff wins; past the last tier ODDS_TTL_IDLE applies
+# (futures, or a sport with nothing scheduled). Only games yet to start pick
+# the tier and the poller's next commence, but in-play games are still fetched
+# and served; DROP_STARTED_EVENTS=1 asks upstream for pre-game odds only
+# (commenceTimeFrom), which hides in-play games from /odds too.
+ODDS_TTL_TIERS = os.getenv("ODDS_TTL_TIERS", "900:15,3600:30,21600:120,86400:600")
+ODDS_TTL_IDLE = float(os.getenv("ODDS_TTL_IDLE", "3600"))
+DROP_STARTED_EVENTS = os.getenv("DROP_STARTED_EVENTS", "0") in ("1", "true", "True")
+
+def parse_ttl_tiers(spec: str) -> List[Tuple[float, float]]:
+    tiers = []
+    for part in spec.split(","):
+        if part.strip():
+            lead, ttl = part.split(":")
+            tiers.append((float(lead), float(ttl)))
+    return sorted(tiers)
+
+_ttl_tiers = parse_ttl_tiers(ODDS_TTL_TIERS)
+
+def parse_commence(value: Optional[str]) -> Optional[float]:
+    try:
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    except Exception:
+        return None
+
+def next_commence(events: List[Dict[str, Any]], now: Optional[float] = None) -> Optional[float]:
+    """Earliest commence_time still in the future, as a timestamp."""
+    now = time.time() if now is None else now
+    starts = [t for t in (parse_commence(e.get("commence_time")) for e in events) if t and t > now]
+    return min(starts) if starts else None
+
+def commence_ttl(start: Optional[float], now: Optional[float] = None) -> float:
+    if start is None:
+        return ODDS_TTL_IDLE
+    lead = start - (time.time() if now is None else now)
+    for max_lead, ttl in _ttl_tiers:
+        if lead <= max_lead:
+            return ttl
+    return ODDS_TTL_IDLE
+
+def odds_ttl(events: List[Dict[str, Any]]) -> float:
+    """Cache lifetime for an odds payload: the tier of its soonest game."""
+    return commence_ttl(next_commence(events))
+
+def drop_started(events: List[Dict[str, Any]], now: Optional[float] = None) -> List[Dict[str, Any]]:
+    now = time.time() if now is None else now
+    return [e for e in events if (parse_commence(e.get("commence_time")) or now + 1) > now]
+
+# -------- Upstream quota scheduler --------
+# Every Odds API call goes through upstream_get, which reads the
+# x-requests-remaining / x-requests-used / x-requests-last headers.
+# ODDS_DAILY_BUDGET (0 = off) caps units spent per UTC day; calls stop once the
+# account has QUOTA_RESERVE units left, and cached data is served instead.
+# Today's spend and the last quota headers live in the shared tier
+# (SHARED_CACHE), so every worker draws on one budget; with SHARED_CACHE=off
+# each process counts on its own. A call's cost is reserved before it is made
+# and settled against x-requests-last afterwards.
+ODDS_DAILY_BUDGET = int(os.getenv("ODDS_DAILY_BUDGET", "0"))
+QUOTA_RESERVE = int(os.getenv("QUOTA_RESERVE", "10"))
+
+class QuotaExhausted(Exception):
+    pass
+
+def _header_int(resp, name: str) -> Optional[int]:
+    try:
+        return int(float(resp.headers.get(name)))
+    except (TypeError, ValueError):
+        return None
+
+class UpstreamScheduler:
+    def __init__(self, daily_budget: int, reserve: int):
+        self.daily_budget = daily_budget
+        self.reserve = reserve
+        self._lock = threading.Lock()
+        self.remaining: Optional[int] = None
+        self.used: Optional[int] = None
+        self.last_cost: Optional[int] = None
+        self._day = datetime.now(timezone.utc).date()
+        self._local = {"used": 0, "calls": 0}
+        self._seen_ts = 0.0
+        # Set once the shared tier exists (see make_shared_cache)
+        self.shared = None
+        self.refused = 0
+        self._next_commence: Dict[str, Optional[float]] = {}
+        self._last_fetch: Dict[str, float] = {}
+
+    def _roll_day(self):
+        today = datetime.now(timezone.utc).date()
+        if today != self._day:
+            self._day, self._local = today, {"used": 0, "calls": 0}
+
+    def _count(self, name: str, amount: int = 0) -> int:
+        """Today's `name` counter ("used" units or "calls") after adding
+        `amount`: shared across workers when there is a shared tier."""
+        self._roll_day()
+        if self.shared is not None:
+            try:
+                return self.shared.incr(f"quota:{self._day.isoformat()}:{name}", amount, 2 * 86400)
+            except Exception as e:
+                dlog("quota_shared_error", counter=name, error=str(e))
+        self._local[name] += amount
+        return self._local[name]
+
+    @property
+    def used_today(self) -> int:
+        with self._lock:
+            return self._count("used")
+
+    @property
+    def calls_today(self) -> int:
+        with self._lock:
+            return self._count("calls")
+
+    def _sync_seen(self):
+        """Adopt quota headers another worker saw more recently than we did."""
+        if self.shared is None:
+            return
+        try:
+            entry = self.shared.get("quota:last")
+        except Exception as e:
+            dlog("quota_shared_error", counter="last", error=str(e))
+            return
+        if entry and entry["ts"] > self._seen_ts:
+            self._seen_ts = entry["ts"]
+            self.remaining, self.used, self.last_cost = (entry["data"].get(k) for k in ("remaining", "used", "last_cost"))
+
+    def check(self, cost: int = 1) -> int:
+        """Refuse (QuotaExhausted) or reserve `cost` units for one call; pass the
+        return value to record(), or to release() if the call never happened."""
+        with self._lock:
+            self._sync_seen()
+            if self.remaining is not None and self.remaining - cost < self.reserve:
+                self.refused += 1
+                raise QuotaExhausted(f"{self.remaining} requests remaining (reserve {self.reserve})")
+            if not self.daily_budget:
+                return 0
+            if self._count("used", cost) > self.daily_budget:
+                self._count("used", -cost)
+                self.refused += 1
+                raise QuotaExhausted(f"daily budget of {self.daily_budget} spent")
+            return cost
+
+    def release(self, reserved: int):
+        if reserved:
+            with self._lock:
+                self._count("used", -reserved)
+
+    def record(self, resp, sport: Optional[str] = None, reserved: int = 0):
+        with self._lock:
+            remaining = _header_int(resp, "x-requests-remaining")
+            used = _header_int(resp, "x-requests-used")
+            cost = _header_int(resp, "x-requests-last")
+            if remaining is not None:
+                self.remaining = remaining
+            if used is not None:
+                self.used = used
+            if cost is not None:
+                self.last_cost = cost
+            if cost is not None and cost != reserved:
+                self._count("used", cost - reserved)
+            self._count("calls", 1)
+            if remaining is not None and self.shared is not None:
+                self._seen_ts = time.time()
+                try:
+                    self.shared.put("quota:last", {"data": {"remaining": remaining, "used": used, "last_cost": cost},
+                                                   "ts": self._seen_ts, "ttl": 86400})
+                except Exception as e:
+                    dlog("quota_shared_error", counter="last", error=str(e))
+        if sport:
+            self.mark_fetched(sport, time.time())
+
+    def mark_fetched(self, sport: str, ts: float):
+        """Count data fetched at `ts` (here or by another worker) towards is_due."""
+        self._last_fetch[sport] = max(ts, self._last_fetch.get(sport, 0.0))
+
+    def note_events(self, sport: str, events: List[Dict[str, Any]]):
+        start = next_commence(events)
+        with self._lock:
+            self._next_commence[sport] = start
+
+    def next_commence(self, sport: str) -> Optional[float]:
+        return self._next_commence.get(sport)
+
+    def burn_factor(self) -> float:
+        """>1 when today's spend is ahead of an even pace through the daily budget."""
+        if not self.daily_budget:
+            return 1.0
+        now = datetime.now(timezone.utc)
+        elapsed = (now.hour * 3600 + now.minute * 60 + now.second + 1) / 86400.0
+        return max(1.0, (self.used_today / self.daily_budget) / elapsed)
+
+    def interval(self, sport: str, base: float) -> float:
+        """Refresh interval: the commence_ttl tier of the sport's next game
+        (base until its schedule is known), stretched by burn_factor."""
+        if sport in self._next_commence:
+            ttl = commence_ttl(self._next_commence[sport])
+        else:
+            ttl = base
+        return ttl * self.burn_factor()
+
+    def is_due(self, sport: str, base: float) -> bool:
+        return time.time() - self._last_fetch.get(sport, 0.0) >= self.interval(sport, base)
+
+    def priority(self, sport: str) -> float:
+        nxt = self._next_commence.get(sport, 0.0)
+        return float("inf") if nxt is None else nxt
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            self._sync_seen()
+            used_today, calls_today = self._count("used"), self._count("calls")
+        return {
+            "remaining": self.remaining,
+            "used": self.used,
+            "last_cost": self.last_cost,
+            "used_today": used_today,
+            "calls_today": calls_today,
+            "shared": self.shared is not None,
+            "daily_budget": self.daily_budget or None,
+            "reserve": self.reserve,
+            "refused": self.refused,
+            "burn_factor": round(self.burn_factor(), 2),
+            "next_commence": {s: (datetime.fromtimestamp(t, timezone.utc).isoformat() if t else None)
+                              for s, t in self._next_commence.items()},
+        }
+
+quota = UpstreamScheduler(ODDS_DAILY_BUDGET, QUOTA_RESERVE)
+
+def upstream_cost(params: Dict[str, Any]) -> int:
+    """Units a call will be charged: markets x regions for odds requests, else 1."""
+    markets = [m for m in str(params.get("markets", "")).split(",") if m]
+    regions = [r for r in str(params.get("regions", "")).split(",") if r]
+    return max(1, len(markets)) * max(1, len(regions))
+
+def upstream_get(path: str, params: Dict[str, Any], timeout: float,
+                 sport: Optional[str] = None, metered: bool = True) -> Any:
+    reserved = quota.check(upstream_cost(params)) if metered else 0
+    try:
+        r = HTTP.get(f"{BASE}{path}", params=params, timeout=timeout)
+    except Exception:
+        quota.release(reserved)
+        raise
+    quota.record(r, sport, reserved)
+    r.raise_for_status()
+    return r.json()
+
+# -------- Shared cross-worker cache --------
+# Upstream odds payloads are also kept where every worker can see them, so one
+# worker per key refreshes within a TTL window and the rest read its result.
+# SHARED_CACHE: "file" (SHARED_CACHE_DIR, flock fill locks; needs fcntl),
+# "redis" (the openings Redis, SET NX fill locks) or "off".
+SHARED_CACHE = os.getenv("SHARED_CACHE", "file")
+SHARED_CACHE_DIR = os.getenv("SHARED_CACHE_DIR", os.path.join(tempfile.gettempdir(), "odds_shared_cache"))
+# How long a worker waits for another worker's fill before fetching itself
+SHARED_FILL_WAIT = float(os.getenv("SHARED_FILL_WAIT", "30"))
+
+class FileSharedCache:
+    """One JSON file per key, replaced atomically; fills serialized by flock."""
+    def __init__(self, root: str):
+        self.root = root
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(self._path(key) + ".json", "rb") as f:
+                return json.loads(f.read())
+        except FileNotFoundError:
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        path = self._path(key) + ".json"
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(json.dumps(entry, separators=(",", ":"), ensure_ascii=False).encode("utf-8"))
+        os.replace(tmp, path)
+
+    def incr(self, key: str, amount: int, ttl: float) -> int:
+        """Add `amount` to an integer counter and return it (flock-serialized).
+        `ttl` is not enforced: counters are a few bytes each."""
+        path = self._path(key) + ".count"
+        with _flock(path + ".lock"):
+            try:
+                with open(path, "rb") as f:
+                    n = int(f.read() or 0)
+            except (OSError, ValueError):
+                n = 0
+            if amount:
+                n += amount
+                tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp, "wb") as f:
+                    f.write(str(n).encode())
+                os.replace(tmp, path)
+        return n
+
+    @contextmanager
+    def fill_lock(self, key: str, wait: float):
+        """Yields True once this worker holds the key's fill lock, False on timeout."""
+        deadline = time.time() + wait
+        while True:
+            with _flock(self._path(key) + ".lock", blocking=False) as got:
+                if got or time.time() >= deadline:
+                    yield got
+                    return
+            time.sleep(0.05)
+
+class RedisSharedCache:
+    """Entries and fill locks as Redis keys under `prefix`."""
+    def __init__(self, client, prefix: str = "oddscache:"):
+        self.client = client
+        self.prefix = prefix
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = self.client.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        expire_ms = int((entry["ttl"] + STALE_SECONDS) * 1000)
+        blob = json.dumps(entry, separators=(",", ":"), ensure_ascii=False)
+        self.client.pipeline([["SET", self.prefix + key, blob, "PX", expire_ms]])
+
+    def incr(self, key: str, amount: int, ttl: float) -> int:
+        """INCRBY `amount` (expiring after `ttl` seconds) and return the new value."""
+        reply = self.client.pipeline([["INCRBY", self.prefix + key, amount],
+                                      ["EXPIRE", self.prefix + key, int(ttl)]])[0]
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return int(reply["result"])
+
+    @contextmanager
+    def fill_lock(self, key: str, wait: float):
+        lock_key, token = f"{self.prefix}lock:{key}", os.urandom(16).hex()
+        deadline = time.time() + wait
+        got = False
+        while True:
+            reply = self.client.pipeline([["SET", lock_key, token, "NX", "PX", int(wait * 1000)]])[0]
+            got = reply.get("result") == "OK"
+            if got or time.time() >= deadline:
+                break
+            time.sleep(0.05)
+        try:
+            yield got
+        finally:
+            # Only our own lock: if the fill outran PX, another worker may hold it now
+            if got:
+                try:
+                    self.client.delete_if_equal(lock_key, token)
+                except Exception as e:
+                    # It still expires after PX
+                    dlog("shared_lock_release_error", key=key, error=str(e))
+
+def make_shared_cache(kind: str):
+    if kind == "file" and fcntl is not None:
+        return FileSharedCache(SHARED_CACHE_DIR)
+    if kind == "redis" and _redis is not None:
+        return RedisSharedCache(_redis)
+    return None
+
+_shared_cache = make_shared_cache(SHARED_CACHE)
+quota.shared = _shared_cache
+
+def _shared_get(key: str) -> Optional[Dict[str, Any]]:
+    try:
+        entry = _shared_cache.get(key)
+    except Exception as e:
+        with _cache_lock:
+            _cache_stats["shared_error"] += 1
+        dlog("shared_cache_get_error", key=key, error=str(e))
+        return None
+    if entry and time.time() - entry["ts"] <= entry["ttl"]:
+        return entry
+    return None
+
+def shared_fill(key: str, loader, ttl=None) -> Tuple[Any, float, float]:
+    """(data, ts, ttl) for `key`: another worker's copy if still fresh, else
+    `loader()` run under the key's fill lock and published for the others."""
+    entry = _shared_get(key)
+    if entry is None:
+        with _shared_cache.fill_lock(key, SHARED_FILL_WAIT):
+            entry = _shared_get(key)                   # filled while we waited
+            if entry is None:
+                data = loader()
+                entry = {"data": data, "ts": time.time(), "ttl": ttl(data) if ttl else CACHE_SECONDS}
+                try:
+                    _shared_cache.put(key, entry)
+                except Exception as e:
+                    with _cache_lock:
+                        _cache_stats["shared_error"] += 1
+                    dlog("shared_cache_put_error", key=key, error=str(e))
+                with _cache_lock:
+                    _cache_stats["shared_fill"] += 1
+                return data, entry["ts"], entry["ttl"]
+    with _cache_lock:
+        _cache_stats["shared_hit"] += 1
+    return entry["data"], entry["ts"], entry["ttl"]
 
 # -------- Odds API --------
-BASE = "https://api.the-odds-api.com/v4"
-def fetch_odds(sport: str, bookmaker: str) -> Any:
-    cache_key = f"odds_raw:{sport}:{bookmaker}"
-    cached = get_cache(cache_key)
-    if cached:
-        return cached
+BASE = os.getenv("ODDS_API_BASE", "https://api.the-odds-api.com/v4")
+def fetch_odds_upstream(sport: str, bookmakers: str) -> Any:
+    """One upstream call; `bookmakers` may be a comma-separated list."""
     params = {
         "apiKey": API_KEY,
         "regions": REGION,
         "markets": ",".join(MARKETS),
-        "bookmakers": bookmaker,
+        "bookmakers": bookmakers,
         "oddsFormat": ODDS_FORMAT,
     }
-    url = f"{BASE}/sports/{sport}/odds"
-    r = HTTP.get(url, params=params, timeout=25)
-    r.raise_for_status()
-    data = r.json()
-    set_cache(cache_key, data)
+    if DROP_STARTED_EVENTS:
+        params["commenceTimeFrom"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    data = upstream_get(f"/sports/{sport}/odds", params, timeout=25, sport=sport)
+    if DROP_STARTED_EVENTS:
+        data = drop_started(data)
+    quota.note_events(sport, data)
     return data
 
-def american_diff(curr: Optional[int], opening: Optional[int]) -> Optional[int]:
-    if curr is None or opening is None:
+def odds_cache_key(sport: str, bookmaker: str) -> str:
+    return f"odds_raw:{sport}:{bookmaker}"
+
+def split_by_bookmaker(events: List[Dict[str, Any]], bookmakers: List[str]) -> Dict[str, List[Dict[str, Any]]]:
+    """Per-bookmaker views of a multi-book payload, shaped like a single-book fetch."""
+    out: Dict[str, List[Dict[str, Any]]] = {b: [] for b in bookmakers}
+    for event in events:
+        blocks = {bk.get("key"): bk for bk in event.get("bookmakers", [])}
+        for b in bookmakers:
+            ev = dict(event)
+            ev["bookmakers"] = [blocks[b]] if b in blocks else []
+            out[b].append(ev)
+    return out
+
+def fan_out_odds(sport: str, events: List[Dict[str, Any]], bookmakers: List[str],
+                 ts: Optional[float] = None, ttl: Optional[float] = None,
+                 size: Optional[int] = None) -> Dict[str, List[Dict[str, Any]]]:
+    """Fill each bookmaker's cache entry from one multi-book payload, stamped
+    with the payload's own fetch time and lifetime (never fresher than it is).
+    `size` is the payload's measured size, if known; each entry is charged its
+    share by bookmaker blocks."""
+    per_book = split_by_bookmaker(events, bookmakers)
+    ttl = odds_ttl(events) if ttl is None else ttl
+    size = _approx_size(events) if size is None else size
+    blocks = {b: sum(len(e["bookmakers"]) for e in evs) for b, evs in per_book.items()}
+    total = sum(blocks.values()) or 1
+    for b, evs in per_book.items():
+        set_cache(odds_cache_key(sport, b), evs, ttl, ts, size=size * blocks[b] // total)
+    return per_book
+
+def fetch_odds_all(sport: str) -> List[Dict[str, Any]]:
+    """Every configured bookmaker in one upstream call (one quota unit per region
+    and market, however many books)."""
+    load = lambda: fetch_odds_upstream(sport, ",".join(BOOKMAKERS))
+    return cached_fetch(f"odds_all:{sport}", load, ttl=odds_ttl, shared=True)
+
+def fetch_odds(sport: str, bookmaker: str) -> Any:
+    if MULTI_BOOK_FETCH and bookmaker in BOOKMAKERS:
+        # Derived from the multi-book payload (only that one is shared): the
+        # per-book entries are re-split whenever odds_all holds a different fetch
+        # than they came from, and carry its ts/ttl, so stale odds_all data
+        # (SWR, or another worker's copy) is never stamped fresh.
+        events = fetch_odds_all(sport)
+        parent = get_cache_entry(f"odds_all:{sport}")
+        if parent is None or parent["data"] is not events:
+            # Evicted or replaced in between: this payload on its own
+            return split_by_bookmaker(events, [bookmaker])[bookmaker]
+        mine = get_cache_entry(odds_cache_key(sport, bookmaker))
+        if mine is not None and mine["ts"] == parent["ts"]:
+            return mine["data"]
+        per_book = fan_out_odds(sport, events, BOOKMAKERS, parent["ts"], parent["ttl"], parent["size"])
+        return per_book[bookmaker]
+    load = lambda: fetch_odds_upstream(sport, bookmaker)
+    return cached_fetch(odds_cache_key(sport, bookmaker), load, ttl=odds_ttl, shared=True)
+
+# -------- Batch line math --------
+# Diffs, American<->decimal conversion and implied probability over whole
+# columns (array('d') or any float sequence, NaN for missing). numpy is used
+# when installed and the batch is at least NUMPY_MIN_BATCH long; otherwise a
+# plain Python pass. The scalar helpers below are wrappers over these.
+NUMPY_MIN_BATCH = 64
+_NAN = float("nan")
+
+def _use_numpy(n: int) -> bool:
+    return np is not None and n >= NUMPY_MIN_BATCH
+
+def _out(values) -> array:
+    return values if isinstance(values, array) else array("d", values)
+
+def batch_american_diff(live, opening) -> array:
+    if _use_numpy(len(live)):
+        return _out(np.subtract(np.asarray(live, dtype=float), np.asarray(opening, dtype=float)).tolist())
+    return array("d", [a - b for a, b in zip(live, opening)])
+
+def batch_point_diff(live, opening) -> array:
+    if _use_numpy(len(live)):
+        diff = np.subtract(np.asarray(live, dtype=float), np.asarray(opening, dtype=float))
+        return _out(np.round(diff, 2).tolist())
+    return array("d", [round(a - b, 2) for a, b in zip(live, opening)])
+
+def batch_american_to_decimal(prices) -> array:
+    if _use_numpy(len(prices)):
+        a = np.asarray(prices, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            d = np.where(a > 0, 1 + a / 100.0, np.where(a < 0, 1 + 100.0 / -a, np.nan))
+        return _out(d.tolist())
+    return array("d", [1 + a / 100.0 if a > 0 else 1 + 100.0 / -a if a < 0 else _NAN for a in prices])
+
+def batch_decimal_to_american(decimals) -> array:
+    if _use_numpy(len(decimals)):
+        d = np.asarray(decimals, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            a = np.where(d >= 2, (d - 1) * 100.0, np.where(d > 1, -100.0 / (d - 1), np.nan))
+        return _out(a.tolist())
+    return array("d", [(d - 1) * 100.0 if d >= 2 else -100.0 / (d - 1) if d > 1 else _NAN for d in decimals])
+
+def batch_implied_probability(prices) -> array:
+    """American price -> implied probability (with the vig)."""
+    if _use_numpy(len(prices)):
+        a = np.asarray(prices, dtype=float)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            p = np.where(a > 0, 100.0 / (a + 100.0), np.where(a < 0, -a / (-a + 100.0), np.nan))
+        return _out(p.tolist())
+    return array("d", [100.0 / (a + 100.0) if a > 0 else -a / (-a + 100.0) if a < 0 else _NAN for a in prices])
+
+def _scalar(batch_fn, *args) -> Optional[float]:
+    if any(a is None for a in args):
         return None
-    return curr - opening
+    v = batch_fn(*([float(a)] for a in args))[0]
+    return None if v != v else v
+
+def american_diff(curr: Optional[int], opening: Optional[int]) -> Optional[int]:
+    v = _scalar(batch_american_diff, curr, opening)
+    return None if v is None else int(v)
 
 def point_diff(curr: Optional[float], opening: Optional[float]) -> Optional[float]:
-    if curr is None or opening is None:
-        return None
-    return round(curr - opening, 2)
+    return _scalar(batch_point_diff, curr, opening)
+
+def american_to_decimal(price: Optional[int]) -> Optional[float]:
+    return _scalar(batch_american_to_decimal, price)
+
+def decimal_to_american(decimal: Optional[float]) -> Optional[int]:
+    v = _scalar(batch_decimal_to_american, decimal)
+    return None if v is None else int(round(v))
+
+def implied_probability(price: Optional[int]) -> Optional[float]:
+    return _scalar(batch_implied_probability, price)
 
 def safe_int(x):
     try:
@@ -247,84 +1313,1107 @@ def extract_bookmaker_block(event: Dict[str, Any], bookmaker: str) -> Optional[D
             return bk
     return None
 
-def normalize_event_record(store: OpeningsStore, sport: str, event: Dict[str, Any], bookmaker: str) -> Dict[str, Any]:
-    event_id = event.get("id")
-    commence = event.get("commence_time")
-    home = event.get("home_team")
-    away = event.get("away_team")
-
-    out = {
-        "event_id": event_id,
-        "commence_time": commence,
-        "home_team": home,
-        "away_team": away,
-        "moneyline": {},
-        "spreads": {},
-        "totals": {}
-    }
+def collect_opening_keys(sport: str, events: List[Dict[str, Any]], bookmaker: str) -> List[str]:
+    """Every make_key normalize_event_record will look up for this payload."""
+    keys = []
+    for event in events:
+        bk = extract_bookmaker_block(event, bookmaker)
+        if not bk:
+            continue
+        for m in bk.get("markets", []):
+            if m.get("key") not in MARKETS:
+                continue
+            for o in m.get("outcomes", []):
+                keys.append(make_key(sport, event.get("id"), m.get("key"), o.get("name"), bookmaker))
+    return keys
 
-    bk = extract_bookmaker_block(event, bookmaker)
-    if not bk:
-        return out
+# -------- Columnar snapshots --------
+# A normalized payload is held as one row per selection in parallel arrays
+# (NaN for None) instead of nested dicts; the JSON records are produced from it
+# only at the edge by to_records().
+MARKET_CODES = {"h2h": 0, "spreads": 1, "totals": 2}
+CODE_TO_RECORD = ("moneyline", "spreads", "totals")
+CODE_TO_MARKET = ("h2h", "spreads", "totals")
 
-    for m in bk.get("markets", []):
-        mkey = m.get("key")
-        outcomes = m.get("outcomes", [])
-        if mkey == "h2h":
-            for o in outcomes:
-                name = o.get("name")
-                price = safe_int(o.get("price"))
-                sel_key = make_key(sport, event_id, "h2h", name, bookmaker)
-                opening = store.get(sel_key)
-                if not opening:
-                    opening = {"opening_price": price, "ts": int(time.time())}
-                    store.setnx(sel_key, opening)
-                diff_val = american_diff(price, opening.get("opening_price"))
-                out["moneyline"][name] = {
-                    "open": opening.get("opening_price"),
-                    "live": price,
-                    "diff": diff_val,
-                }
+_selection_lock = threading.Lock()
+_selection_ids: Dict[str, int] = {}
+_selection_keys: List[str] = []
 
-        elif mkey == "spreads":
-            for o in outcomes:
-                name = o.get("name")
-                price = safe_int(o.get("price"))
-                point = safe_float(o.get("point"))
-                sel_key = make_key(sport, event_id, "spreads", name, bookmaker)
-                opening = store.get(sel_key)
-                if not opening:
-                    opening = {"opening_point": point, "opening_price": price, "ts": int(time.time())}
-                    store.setnx(sel_key, opening)
-                diff_pt = point_diff(point, opening.get("opening_point"))
-                out["spreads"][name] = {
-                    "open_point": opening.get("opening_point"),
-                    "open_price": opening.get("opening_price"),
-                    "live_point": point,
+def intern_selection(key: str) -> int:
+    sid = _selection_ids.get(key)
+    if sid is None:
+        with _selection_lock:
+            sid = _selection_ids.get(key)
+            if sid is None:
+                sid = _selection_ids[key] = len(_selection_keys)
+                _selection_keys.append(key)
+    return sid
+
+def selection_key(sid: int) -> str:
+    return _selection_keys[sid]
+
+def _nan(x) -> float:
+    try:
+        return _NAN if x is None else float(x)
+    except (TypeError, ValueError):
+        return _NAN
+
+def _int_or_none(x: float) -> Optional[int]:
+    return None if x != x else int(x)
+
+def _float_or_none(x: float) -> Optional[float]:
+    return None if x != x else x
+
+class OddsSnapshot:
+    __slots__ = ("sport", "bookmaker", "events", "ev", "mkt", "sid", "name",
+                 "price", "point", "open_price", "open_point", "ts")
+
+    def __init__(self, sport: str, bookmaker: str):
+        self.sport = sport
+        self.bookmaker = bookmaker
+        # (event_id, commence_time, home_team, away_team), in commence_time order
+        self.events: List[Tuple[Any, Any, Any, Any]] = []
+        self.ev = array("i")        # row -> index into events
+        self.mkt = array("b")       # row -> MARKET_CODES value
+        self.sid = array("l")       # row -> interned make_key id
+        self.name: List[str] = []   # row -> outcome name as sent upstream
+        self.price = array("d")
+        self.point = array("d")
+        self.open_price = array("d")
+        self.open_point = array("d")
+        self.ts = array("d")        # opening timestamp
+
+    def __len__(self) -> int:
+        return len(self.sid)
+
+    def add_event(self, event: Dict[str, Any]) -> int:
+        self.events.append((event.get("id"), event.get("commence_time"),
+                            event.get("home_team"), event.get("away_team")))
+        return len(self.events) - 1
+
+    def add_row(self, ev: int, market: str, key: str, name: str, price, point, opening: Dict[str, Any]):
+        self.ev.append(ev)
+        self.mkt.append(MARKET_CODES[market])
+        self.sid.append(intern_selection(key))
+        self.name.append(sys.intern(name) if isinstance(name, str) else name)
+        self.price.append(_nan(price))
+        self.point.append(_nan(point))
+        self.open_price.append(_nan(opening.get("opening_price")))
+        self.open_point.append(_nan(opening.get("opening_point")))
+        self.ts.append(_nan(opening.get("ts")))
+
+    def implied_probabilities(self) -> array:
+        return batch_implied_probability(self.price)
+
+    def to_records(self) -> List[Dict[str, Any]]:
+        records = [{
+            "event_id": event_id,
+            "commence_time": commence,
+            "home_team": home,
+            "away_team": away,
+            "moneyline": {},
+            "spreads": {},
+            "totals": {},
+        } for event_id, commence, home, away in self.events]
+        price_diff = batch_american_diff(self.price, self.open_price)
+        pt_diff = batch_point_diff(self.point, self.open_point)
+        for i in range(len(self.sid)):
+            code = self.mkt[i]
+            price = _int_or_none(self.price[i])
+            open_price = _int_or_none(self.open_price[i])
+            if code == 0:
+                entry = {"open": open_price, "live": price, "diff": _int_or_none(price_diff[i])}
+            else:
+                entry = {
+                    "open_point": _float_or_none(self.open_point[i]),
+                    "open_price": open_price,
+                    "live_point": _float_or_none(self.point[i]),
                     "live_price": price,
-                    "diff_point": diff_pt,
+                    "diff_point": _float_or_none(pt_diff[i]),
                 }
+            records[self.ev[i]][CODE_TO_RECORD[code]][self.name[i]] = entry
+        return records
 
-        elif mkey == "totals":
-            for o in outcomes:
+def build_snapshot(store: OpeningsStore, sport: str, events: List[Dict[str, Any]], bookmaker: str) -> OddsSnapshot:
+    """Normalize a payload against the openings store, recording first-seen
+    lines as openings. Keys should already be prefetched (see build_view)."""
+    snap = OddsSnapshot(sport, bookmaker)
+    for event in sorted(events, key=lambda e: e.get("commence_time") or ""):
+        ev = snap.add_event(event)
+        bk = extract_bookmaker_block(event, bookmaker)
+        if not bk:
+            continue
+        for m in bk.get("markets", []):
+            mkey = m.get("key")
+            if mkey not in MARKET_CODES:
+                continue
+            for o in m.get("outcomes", []):
                 name = o.get("name")
                 price = safe_int(o.get("price"))
-                point = safe_float(o.get("point"))
-                sel_key = make_key(sport, event_id, "totals", name, bookmaker)
+                point = None if mkey == "h2h" else safe_float(o.get("point"))
+                sel_key = make_key(sport, event.get("id"), mkey, name, bookmaker)
                 opening = store.get(sel_key)
                 if not opening:
-                    opening = {"opening_point": point, "opening_price": price, "ts": int(time.time())}
+                    opening = {"opening_price": price, "ts": int(time.time())}
+                    if mkey != "h2h":
+                        opening = {"opening_point": point, **opening}
                     store.setnx(sel_key, opening)
-                diff_pt = point_diff(point, opening.get("opening_point"))
-                out["totals"][name] = {
-                    "open_point": opening.get("opening_point"),
-                    "open_price": opening.get("opening_price"),
-                    "live_point": point,
-                    "live_price": price,
-                    "diff_point": diff_pt,
-                }
+                snap.add_row(ev, mkey, sel_key, name, price, point, opening)
+    return snap
 
-    return out
+def build_view(store: OpeningsStore, sport: str, events: List[Dict[str, Any]], bookmaker: str) -> OddsSnapshot:
+    store.prefetch(collect_opening_keys(sport, events, bookmaker))
+    snap = build_snapshot(store, sport, events, bookmaker)
+    line_history.observe(snap)
+    move_detector.observe(snap)
+    return snap
+
+def build_records(store: OpeningsStore, sport: str, events: List[Dict[str, Any]], bookmaker: str) -> List[Dict[str, Any]]:
+    return build_view(store, sport, events, bookmaker).to_records()
+
+def normalize_event_record(store: OpeningsStore, sport: str, event: Dict[str, Any], bookmaker: str) -> Dict[str, Any]:
+    return build_snapshot(store, sport, [event], bookmaker).to_records()[0]
+
+# -------- Line movement history --------
+# Every observed change per make_key selection, appended to HISTORY_PATH as
+# [key, ts, price, point] lines; unchanged polls write nothing. The file is
+# shared by all workers: each appends under an exclusive flock after reading
+# what the others appended, so a move is written once and every worker answers
+# /history from the same log. Moves older than HISTORY_RETENTION_HOURS are
+# pruned from memory every HISTORY_PRUNE_SECONDS, and the file is rewritten
+# without them once its oldest line is a quarter of the retention past it.
+HISTORY_PATH = os.getenv("HISTORY_PATH", "odds_history.log")
+HISTORY_RETENTION_HOURS = float(os.getenv("HISTORY_RETENTION_HOURS", "72"))
+HISTORY_PRUNE_SECONDS = float(os.getenv("HISTORY_PRUNE_SECONDS", "600"))
+
+
+class LineHistory:
+    """Selection keys are interned to ints; each selection's moves live in
+    parallel array('d') columns (ts, price, point; NaN for None) so range
+    queries are a bisect on ts. Selections are indexed by (sport, event_id)."""
+    def __init__(self, path: str):
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._lock = threading.Lock()
+        self._reset()
+        # (inode, offset) of HISTORY_PATH read so far
+        self._cursor: Optional[Tuple[int, int]] = None
+        self._pruned_at = time.time()
+        self._compacting = False
+        with self._lock, _flock(self.lock_path, exclusive=True):
+            _truncate_torn_tail(self.path)
+            self._catch_up()
+
+    def _reset(self):
+        self._ids: Dict[str, int] = {}
+        self._keys: List[str] = []
+        self._series: List[Tuple[array, array, array]] = []
+        self._by_event: Dict[Tuple[str, str], List[int]] = {}
+
+    def _catch_up(self):
+        """Apply lines appended since our cursor (ours or another worker's).
+        A compacted file (new inode) is reloaded from the start. Callers hold
+        self._lock and the file lock."""
+        sig = _file_sig(self.path)
+        if sig is None:
+            if self._cursor is not None:
+                self._reset()
+                self._cursor = None
+            return
+        inode, offset = self._cursor or (sig[0], 0)
+        if inode != sig[0] or sig[2] < offset:
+            self._reset()
+            inode, offset = sig[0], 0
+        if sig[2] > offset:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read(sig[2] - offset)
+            end = chunk.rfind(b"\n") + 1
+            cutoff = time.time() - HISTORY_RETENTION_HOURS * 3600
+            for line in chunk[:end].splitlines():
+                try:
+                    key, ts, price, point = json.loads(line)
+                except Exception:
+                    continue
+                if ts >= cutoff:
+                    self._append(key, ts, price, point)
+            offset += end
+        self._cursor = (inode, offset)
+
+    def _sid(self, key: str) -> int:
+        sid = self._ids.get(key)
+        if sid is None:
+            sid = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+            self._series.append((array("d"), array("d"), array("d")))
+            parsed = parse_key(key)
+            if parsed:
+                self._by_event.setdefault((parsed[0], parsed[1]), []).append(sid)
+        return sid
+
+    def _append(self, key: str, ts: float, price, point) -> bool:
+        ts_a, price_a, point_a = self._series[self._sid(key)]
+        p = _NAN if price is None else float(price)
+        q = _NAN if point is None else float(point)
+        if ts_a and _same(price_a[-1], p) and _same(point_a[-1], q):
+            return False
+        if ts_a and ts < ts_a[-1]:
+            return False
+        ts_a.append(ts)
+        price_a.append(p)
+        point_a.append(q)
+        return True
+
+    def observe(self, snap: "OddsSnapshot", ts: Optional[float] = None):
+        ts = int(ts if ts is not None else time.time())
+        with self._lock, _flock(self.lock_path, exclusive=True):
+            # Moves another worker already wrote compare equal to its last quote
+            self._catch_up()
+            lines = []
+            for i in range(len(snap)):
+                key = selection_key(snap.sid[i])
+                price, point = _num(snap.price[i]), _num(snap.point[i])
+                if self._append(key, ts, price, point):
+                    lines.append(json.dumps([key, ts, price, point], separators=(",", ":"), ensure_ascii=False))
+            if lines:
+                try:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write("\n".join(lines) + "\n")
+                    sig = _file_sig(self.path)
+                    self._cursor = (sig[0], sig[2])
+                except OSError as e:
+                    log.warning("history append failed: %s", e)
+        if time.time() - self._pruned_at >= HISTORY_PRUNE_SECONDS:
+            self.prune()
+
+    def prune(self):
+        """Drop moves past the retention and selections left empty, then start
+        a background compaction of the file if it is due."""
+        cutoff = time.time() - HISTORY_RETENTION_HOURS * 3600
+        with self._lock:
+            self._pruned_at = time.time()
+            old = list(zip(self._keys, self._series))
+            self._reset()
+            for key, (ts_a, price_a, point_a) in old:
+                lo = bisect_left(ts_a, cutoff)
+                if lo < len(ts_a):
+                    self._series[self._sid(key)] = (ts_a[lo:], price_a[lo:], point_a[lo:])
+            if self._compacting:
+                return
+            self._compacting = True
+        threading.Thread(target=self._compact_bg, daemon=True).start()
+
+    def _compact_bg(self):
+        try:
+            self.compact()
+        except Exception as e:
+            log.warning("history compaction failed: %s", e)
+        finally:
+            with self._lock:
+                self._compacting = False
+
+    def compact(self):
+        """Rewrite the file without moves past the retention (other workers
+        see the new inode and reload), once its oldest line is far enough past."""
+        cutoff = time.time() - HISTORY_RETENTION_HOURS * 3600
+        with _flock(self.lock_path + ".compact", blocking=False) as got:
+            if not got:
+                return
+            with _flock(self.lock_path, exclusive=True):
+                try:
+                    with open(self.path, "rb") as f:
+                        first = json.loads(f.readline())[1]
+                except (OSError, ValueError, IndexError):
+                    return
+                if first >= cutoff - HISTORY_RETENTION_HOURS * 900:
+                    return
+                kept = dropped = 0
+                tmp = self.path + ".tmp"
+                with open(self.path, "rb") as src, open(tmp, "wb") as dst:
+                    for line in src:
+                        try:
+                            ts = json.loads(line)[1]
+                        except Exception:
+                            ts = None
+                        if ts is None or ts < cutoff or not line.endswith(b"\n"):
+                            dropped += 1
+                            continue
+                        dst.write(line)
+                        kept += 1
+                os.replace(tmp, self.path)
+            dlog("history_compacted", kept=kept, dropped=dropped)
+
+    def query(self, sport: str, event_id: str, since: float, until: float,
+              market: Optional[str] = None, bookmaker: Optional[str] = None) -> List[Dict[str, Any]]:
+        out = []
+        with self._lock:
+            with _flock(self.lock_path, exclusive=False):
+                self._catch_up()
+            for sid in self._by_event.get((sport, event_id), []):
+                _, _, mkt, sel, bk = parse_key(self._keys[sid])
+                if (market and mkt != market) or (bookmaker and bk != bookmaker):
+                    continue
+                ts_a, price_a, point_a = self._series[sid]
+                lo, hi = bisect_left(ts_a, since), bisect_right(ts_a, until)
+                if lo >= hi:
+                    continue
+                out.append({
+                    "market": mkt,
+                    "selection": sel,
+                    "bookmaker": bk,
+                    "moves": [{"ts": int(ts_a[i]), "price": _num(price_a[i]), "point": _num(point_a[i])}
+                              for i in range(lo, hi)],
+                })
+        return out
+
+def _same(a: float, b: float) -> bool:
+    return a == b or (a != a and b != b)
+
+def _num(x: float):
+    if x != x:
+        return None
+    return int(x) if x.is_integer() else x
+
+line_history = LineHistory(HISTORY_PATH)
+
+# -------- Sharp / steam move detection --------
+# sharp: one book moves a selection's implied probability by >= SHARP_PRICE
+#        (0.03 is about -110 -> -125) or its line by >= SHARP_POINT within
+#        STEAM_WINDOW_SECONDS. Prices are compared as probabilities, so a move
+#        across even money (-102 -> +102) counts for what it is, not 204 cents.
+# steam: >= STEAM_MIN_BOOKS books move the same selection the same way within the window
+# Alerts go to ALERTS_PATH, shared by all workers like HISTORY_PATH: ids are
+# assigned under its exclusive flock, so /alerts?since_id= pages through one
+# sequence whichever worker answers. Each worker runs its own detector over
+# the snapshots it builds; an alert another worker already logged for the same
+# move inside the window is not logged again.
+STEAM_WINDOW_SECONDS = float(os.getenv("STEAM_WINDOW_SECONDS", "900"))
+SHARP_PRICE = float(os.getenv("SHARP_PRICE", "0.03"))
+SHARP_POINT = float(os.getenv("SHARP_POINT", "1.0"))
+STEAM_MIN_BOOKS = int(os.getenv("STEAM_MIN_BOOKS", "3"))
+DETECTOR_MAX_SELECTIONS = int(os.getenv("DETECTOR_MAX_SELECTIONS", "50000"))
+ALERTS_MAX = 1000
+ALERTS_PATH = os.getenv("ALERTS_PATH", "odds_alerts.log")
+
+class MoveDetector:
+    """Consumes successive snapshots and emits alerts.
+
+    State is one small record per selection (last quote plus the moves inside
+    the window) and one per book-less selection group, both in LRU maps capped
+    at DETECTOR_MAX_SELECTIONS. Each snapshot row is O(1) amortized, so the
+    cost of a snapshot depends on its own size, not on how many selections
+    are tracked.
+    """
+    def __init__(self, window: float, max_selections: int, path: str):
+        self.window = window
+        self.max_selections = max_selections
+        self.path = path
+        self.lock_path = path + ".lock"
+        self._lock = threading.Lock()
+        # sid -> [last_price, last_point, last_prob, deque[(ts, price, point, prob)]]
+        self._sel: "OrderedDict[int, list]" = OrderedDict()
+        # group key -> [deque[(ts, bookmaker, direction)], last steam alert ts]
+        self._groups: "OrderedDict[str, list]" = OrderedDict()
+        # Latest ALERTS_MAX alerts from every worker, and (inode, offset, lines) read
+        self.alerts: Deque[Dict[str, Any]] = deque(maxlen=ALERTS_MAX)
+        self._cursor: Optional[Tuple[int, int, int]] = None
+        self._pending: List[Dict[str, Any]] = []
+        # ids this worker logged: its own repeats of a move are real moves
+        self._own: Deque[int] = deque(maxlen=ALERTS_MAX)
+        with self._lock, _flock(self.lock_path, exclusive=True):
+            _truncate_torn_tail(self.path)
+            self._catch_up()
+
+    def _catch_up(self):
+        """Read alerts appended since our cursor; a rewritten file (new inode)
+        is read from the start. Callers hold self._lock and the file lock."""
+        sig = _file_sig(self.path)
+        if sig is None:
+            self.alerts.clear()
+            self._cursor = None
+            return
+        inode, offset, lines = self._cursor or (sig[0], 0, 0)
+        if inode != sig[0] or sig[2] < offset:
+            self.alerts.clear()
+            inode, offset, lines = sig[0], 0, 0
+        if sig[2] > offset:
+            with open(self.path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read(sig[2] - offset)
+            end = chunk.rfind(b"\n") + 1
+            for line in chunk[:end].splitlines():
+                lines += 1
+                try:
+                    self.alerts.append(json.loads(line))
+                except ValueError:
+                    continue
+            offset += end
+        self._cursor = (inode, offset, lines)
+
+    @staticmethod
+    def _same_move(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        fields = ("kind", "sport", "event_id", "market", "selection", "bookmaker", "direction", "to")
+        return all(a.get(f) == b.get(f) for f in fields)
+
+    def _publish(self):
+        """Log pending alerts under the exclusive file lock, numbering them
+        after the last id in the file and skipping moves another worker
+        already logged. Callers hold self._lock."""
+        pending, self._pending = self._pending, []
+        with _flock(self.lock_path, exclusive=True):
+            self._catch_up()
+            last_id = self.alerts[-1]["id"] if self.alerts else 0
+            own = set(self._own)
+            lines = []
+            for alert in pending:
+                if any(a["ts"] >= alert["ts"] - self.window and a["id"] not in own and self._same_move(a, alert)
+                       for a in reversed(self.alerts)):
+                    continue
+                last_id += 1
+                self._own.append(last_id)
+                alert = {"id": last_id, **alert}
+                self.alerts.append(alert)
+                lines.append(json.dumps(alert, separators=(",", ":"), ensure_ascii=False))
+                dlog("move_alert", **alert)
+            if not lines:
+                return
+            count = (self._cursor[2] if self._cursor else 0) + len(lines)
+            try:
+                if count > 2 * ALERTS_MAX:
+                    # Keep the file to the alerts we still serve; ids carry over
+                    tmp = self.path + ".tmp"
+                    with open(tmp, "w", encoding="utf-8") as f:
+                        f.write("".join(json.dumps(a, separators=(",", ":"), ensure_ascii=False) + "\n"
+                                        for a in self.alerts))
+                    os.replace(tmp, self.path)
+                    sig = _file_sig(self.path)
+                    self._cursor = (sig[0], sig[2], len(self.alerts))
+                else:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write("\n".join(lines) + "\n")
+                    sig = _file_sig(self.path)
+                    self._cursor = (sig[0], sig[2], count)
+            except OSError as e:
+                log.warning("alerts append failed: %s", e)
+
+    def _touch(self, table: OrderedDict, key, default):
+        entry = table.get(key)
+        if entry is None:
+            entry = table[key] = default()
+            if len(table) > self.max_selections:
+                table.popitem(last=False)
+        else:
+            table.move_to_end(key)
+        return entry
+
+    def _alert(self, kind: str, key: str, ts: float, **extra):
+        sport, event_id, market, sel, bookmaker = parse_key(key)
+        alert = {"ts": int(ts), "kind": kind, "sport": sport,
+                 "event_id": event_id, "market": market, "selection": sel, **extra}
+        if kind == "sharp":
+            alert["bookmaker"] = bookmaker
+        self._pending.append(alert)
+
+    def observe(self, snap: "OddsSnapshot", ts: Optional[float] = None):
+        ts = ts if ts is not None else time.time()
+        horizon = ts - self.window
+        probs = batch_implied_probability(snap.price)
+        with self._lock:
+            for i in range(len(snap)):
+                price, point, prob = snap.price[i], snap.point[i], probs[i]
+                st = self._sel.get(snap.sid[i])
+                if st is None:
+                    self._touch(self._sel, snap.sid[i],
+                                lambda: [price, point, prob, deque([(ts, price, point, prob)])])
+                    continue
+                if _same(st[0], price) and _same(st[1], point):
+                    continue
+                self._sel.move_to_end(snap.sid[i])
+                key = selection_key(snap.sid[i])
+                d_point = point - st[1] if point == point and st[1] == st[1] else 0.0
+                # a longer price is a lower implied probability: "up" means better odds
+                d_price = st[2] - prob if prob == prob and st[2] == st[2] else 0.0
+                st[0], st[1], st[2] = price, point, prob
+                moves = st[3]
+                moves.append((ts, price, point, prob))
+                while moves[0][0] < horizon:
+                    moves.popleft()
+                t0, p0, q0, r0 = moves[0]
+                if (q0 == q0 and point == point and abs(point - q0) >= SHARP_POINT) or \
+                        (r0 == r0 and prob == prob and abs(prob - r0) >= SHARP_PRICE):
+                    self._alert("sharp", key, ts, window_seconds=int(ts - t0),
+                                **{"from": {"price": _num(p0), "point": _num(q0)},
+                                   "to": {"price": _num(price), "point": _num(point)}})
+                    moves.clear()
+                    moves.append((ts, price, point, prob))
+                direction = (d_point > 0) - (d_point < 0) or (d_price > 0) - (d_price < 0)
+                if not direction:
+                    continue
+                group_key, bookmaker = key.rsplit(":", 1)
+                group = self._touch(self._groups, group_key, lambda: [deque(), 0.0])
+                gmoves = group[0]
+                gmoves.append((ts, bookmaker, direction))
+                while gmoves[0][0] < horizon:
+                    gmoves.popleft()
+                books = {b for _, b, dirn in gmoves if dirn == direction}
+                if len(books) >= STEAM_MIN_BOOKS and ts - group[1] >= self.window:
+                    group[1] = ts
+                    self._alert("steam", key, ts, direction="up" if direction > 0 else "down",
+                                books=sorted(books))
+            if self._pending:
+                self._publish()
+
+    def recent(self, since_id: int = 0, sport: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            with _flock(self.lock_path, exclusive=False):
+                self._catch_up()
+            return [a for a in self.alerts if a["id"] > since_id and (sport is None or a["sport"] == sport)]
+
+move_detector = MoveDetector(STEAM_WINDOW_SECONDS, DETECTOR_MAX_SELECTIONS, ALERTS_PATH)
+
+# -------- Background poller --------
+# ODDS_POLLER=1 walks ALLOWED_SPORTS x BOOKMAKERS (one call per sport with
+# MULTI_BOOK_FETCH), refreshing the odds cache and recording openings whether or
+# not anyone is looking. Each sport is refetched on its commence_ttl tier;
+# POLL_SECONDS applies until its schedule is known. Calls are spaced +/- POLL_JITTER.
+POLLER_ENABLED = os.getenv("ODDS_POLLER", "0") in ("1", "true", "True")
+POLL_SECONDS = float(os.getenv("POLL_SECONDS", "60"))
+POLL_JITTER = float(os.getenv("POLL_JITTER", "0.2"))
+POLL_BUDGET_PER_HOUR = int(os.getenv("POLL_BUDGET_PER_HOUR", "500"))
+# With the poller on, handlers return 503 for combos it has not produced yet
+SERVE_PRECOMPUTED_ONLY = os.getenv("SERVE_PRECOMPUTED_ONLY", "0") in ("1", "true", "True")
+
+_precomputed_lock = threading.Lock()
+_precomputed: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+def get_precomputed(sport: str, bookmaker: str) -> Optional[Dict[str, Any]]:
+    with _precomputed_lock:
+        entry = _precomputed.get((sport, bookmaker))
+    if not entry or time.time() - entry["ts"] > entry["ttl"] + STALE_SECONDS:
+        return None
+    return entry
+
+class OddsPoller:
+    def __init__(self, sports: List[str], bookmakers: List[str], interval: float,
+                 jitter: float, budget_per_hour: int):
+        if MULTI_BOOK_FETCH:
+            self.combos = [(s, tuple(bookmakers)) for s in sports]
+        else:
+            self.combos = [(s, (b,)) for s in sports for b in bookmakers]
+        self.interval = interval
+        self.jitter = jitter
+        self.budget_per_hour = budget_per_hour
+        self._calls: Deque[float] = deque()
+        self._thread: Optional[threading.Thread] = None
+        self.stats = {"cycles": 0, "fetched": 0, "errors": 0, "skipped_budget": 0, "not_due": 0, "last_cycle_ts": None}
+
+    def _take_budget(self) -> bool:
+        now = time.time()
+        while self._calls and now - self._calls[0] > 3600:
+            self._calls.popleft()
+        if len(self._calls) >= self.budget_per_hour:
+            return False
+        self._calls.append(now)
+        return True
+
+    def refresh(self, sport: str, bookmakers: Tuple[str, ...]):
+        load = lambda: fetch_odds_upstream(sport, ",".join(bookmakers))
+        if _shared_cache is not None:
+            # Another worker's poller may have fetched this combo already
+            key = f"odds_all:{sport}" if len(bookmakers) > 1 else odds_cache_key(sport, bookmakers[0])
+            events, ts, ttl = shared_fill(key, load, odds_ttl)
+            quota.mark_fetched(sport, ts)
+            quota.note_events(sport, events)
+        else:
+            events = load()
+            ts, ttl = time.time(), odds_ttl(events)
+        # Everything derived from this payload keeps its fetch time, so another
+        # worker's copy is not treated as fresher than it is
+        size = _approx_size(events)
+        per_book = fan_out_odds(sport, events, list(bookmakers), ts, ttl, size)
+        if len(bookmakers) > 1:
+            set_cache(f"odds_all:{sport}", events, ttl, ts, size=size)
+            arb_scanner.update(sport, events)
+        store = get_openings_store()
+        for bookmaker, data in per_book.items():
+            snap = build_view(store, sport, data, bookmaker)
+            with _precomputed_lock:
+                _precomputed[(sport, bookmaker)] = {"snapshot": snap, "ts": ts, "ver": next(_versions),
+                                                    "ttl": ttl}
+        store.flush_if_needed()
+
+    def run_cycle(self):
+        # Soonest-starting sports first; each is refreshed only when quota.interval
+        # says it is due. Calls are spread over the shortest tier rather than bursting.
+        shortest = min([self.interval] + [ttl for _, ttl in _ttl_tiers])
+        gap = shortest / max(1, len(self.combos))
+        fetched = False
+        for sport, bookmakers in sorted(self.combos, key=lambda c: quota.priority(c[0])):
+            if not quota.is_due(sport, self.interval):
+                self.stats["not_due"] += 1
+                continue
+            fetched = True
+            if not self._take_budget():
+                self.stats["skipped_budget"] += 1
+            else:
+                try:
+                    self.refresh(sport, bookmakers)
+                    self.stats["fetched"] += 1
+                except Exception as e:
+                    self.stats["errors"] += 1
+                    log.warning("poll %s/%s failed: %s", sport, ",".join(bookmakers), e)
+            time.sleep(gap * random.uniform(1 - self.jitter, 1 + self.jitter))
+        if not fetched:
+            time.sleep(gap)
+        self.stats["cycles"] += 1
+        self.stats["last_cycle_ts"] = int(time.time())
+
+    def start(self):
+        if self._thread is not None:
+            return
+        def _loop():
+            while True:
+                try:
+                    self.run_cycle()
+                except Exception:
+                    time.sleep(5.0)
+        self._thread = threading.Thread(target=_loop, daemon=True)
+        self._thread.start()
+
+poller = OddsPoller(ALLOWED_SPORTS, BOOKMAKERS, POLL_SECONDS, POLL_JITTER, POLL_BUDGET_PER_HOUR)
+if POLLER_ENABLED and API_KEY:
+    poller.start()
+
+# -------- Line movement stream (SSE) --------
+# Every open stream holds a worker thread. Under gunicorn's default sync worker
+# that is the whole worker, so streaming is off unless STREAM_MAX_CLIENTS > 0;
+# turn it on only with threaded or async workers (e.g. `gunicorn -k gthread
+# --threads 32`, or `-k gevent`) and keep it well below the thread count, or
+# serve streams from app6_async. Each stream ends after STREAM_MAX_SECONDS
+# (under gunicorn's 30s worker timeout) and the browser reconnects on its own.
+STREAM_POLL_SECONDS = float(os.getenv("STREAM_POLL_SECONDS", "5"))
+STREAM_QUEUE_MAX = 100
+STREAM_MAX_CLIENTS = int(os.getenv("STREAM_MAX_CLIENTS", "0"))
+STREAM_MAX_SECONDS = float(os.getenv("STREAM_MAX_SECONDS", "25"))
+STREAM_RETRY_MS = 2000
+
+# Fields of a normalized entry that move with the live line
+LIVE_FIELDS = {"moneyline": ("live",), "spreads": ("live_point", "live_price"), "totals": ("live_point", "live_price")}
+
+def diff_records(prev: List[Dict[str, Any]], curr: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Selections whose live price or point differs between two record lists."""
+    prev_by_id = {r.get("event_id"): r for r in prev}
+    moves = []
+    for r in curr:
+        p = prev_by_id.get(r.get("event_id"), {})
+        for market, fields in LIVE_FIELDS.items():
+            old_market = p.get(market) or {}
+            for sel, entry in r.get(market, {}).items():
+                old = old_market.get(sel)
+                if old is None or any(old.get(f) != entry.get(f) for f in fields):
+                    moves.append({"event_id": r.get("event_id"), "market": market, "selection": sel, **entry})
+    return moves
+
+class MovementHub:
+    """Fan-out of line moves to stream subscribers, one queue per connection.
+    A subscriber that falls STREAM_QUEUE_MAX messages behind gets a None (resync).
+    At most `max_clients` connections per process; subscribe returns None past that."""
+    def __init__(self, max_clients: int):
+        self.max_clients = max_clients
+        self._lock = threading.Lock()
+        self._subs: Dict[Tuple[str, str], List[queue.Queue]] = {}
+        self._count = 0
+
+    def subscribe(self, sport: str, bookmaker: str) -> Optional[queue.Queue]:
+        q: queue.Queue = queue.Queue(maxsize=STREAM_QUEUE_MAX)
+        with self._lock:
+            if self._count >= self.max_clients:
+                return None
+            self._count += 1
+            self._subs.setdefault((sport, bookmaker), []).append(q)
+        return q
+
+    def unsubscribe(self, sport: str, bookmaker: str, q: queue.Queue):
+        with self._lock:
+            subs = self._subs.get((sport, bookmaker), [])
+            if q in subs:
+                subs.remove(q)
+                self._count -= 1
+            if not subs:
+                self._subs.pop((sport, bookmaker), None)
+
+    def has_subscribers(self, sport: str, bookmaker: str) -> bool:
+        return bool(self._subs.get((sport, bookmaker)))
+
+    def publish(self, sport: str, bookmaker: str, moves: List[Dict[str, Any]]):
+        if not moves:
+            return
+        with self._lock:
+            subs = list(self._subs.get((sport, bookmaker), []))
+        for q in subs:
+            try:
+                q.put_nowait(moves)
+            except queue.Full:
+                with q.mutex:
+                    q.queue.clear()
+                q.put_nowait(None)
+
+movement_hub = MovementHub(STREAM_MAX_CLIENTS)
+
+def _sse(event: str, payload: Any) -> str:
+    return f"event: {event}\ndata: {app.json.dumps(payload)}\n\n"
+
+# -------- Delta responses (/odds?since=<cursor>) --------
+# The cursor is a view's ETag; the last DELTA_HISTORY distinct views are kept per (sport, bookmaker)
+DELTA_HISTORY = int(os.getenv("DELTA_HISTORY", "20"))
+RECORD_MARKETS = ("moneyline", "spreads", "totals")
+
+_view_history: Dict[Tuple[str, str], "OrderedDict[str, OddsSnapshot]"] = {}
+
+def remember_view(sport: str, bookmaker: str, etag: str, snap: OddsSnapshot):
+    with _responses_lock:
+        ring = _view_history.setdefault((sport, bookmaker), OrderedDict())
+        ring[etag] = snap
+        ring.move_to_end(etag)
+        while len(ring) > DELTA_HISTORY:
+            ring.popitem(last=False)
+
+def get_past_view(sport: str, bookmaker: str, etag: str) -> Optional[OddsSnapshot]:
+    with _responses_lock:
+        return _view_history.get((sport, bookmaker), {}).get(etag)
+
+def delta_records(old: List[Dict[str, Any]], new: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """added: new records; removed: event_ids gone; changed: per event, only the
+    fields and market entries that differ (removed selections map to None)."""
+    old_by_id = {r.get("event_id"): r for r in old}
+    new_ids = set()
+    added, changed = [], []
+    for r in new:
+        eid = r.get("event_id")
+        new_ids.add(eid)
+        o = old_by_id.get(eid)
+        if o is None:
+            added.append(r)
+            continue
+        diff: Dict[str, Any] = {}
+        for k, v in r.items():
+            if k in RECORD_MARKETS:
+                om = o.get(k) or {}
+                md = {sel: e for sel, e in v.items() if om.get(sel) != e}
+                md.update({sel: None for sel in om if sel not in v})
+                if md:
+                    diff[k] = md
+            elif o.get(k) != v:
+                diff[k] = v
+        if diff:
+            diff["event_id"] = eid
+            changed.append(diff)
+    removed = [eid for eid in old_by_id if eid not in new_ids]
+    return {"added": added, "removed": removed, "changed": changed}
+
+# -------- Pre-serialized /odds responses --------
+class OddsNotReady(Exception):
+    pass
+
+_responses_lock = threading.Lock()
+_responses: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+def odds_view(sport: str, bookmaker: str) -> Dict[str, Any]:
+    """Normalized snapshot plus the serialized /odds body for (sport, bookmaker).
+
+    The body is rebuilt only when its version changes: the poller's record
+    version, or else the cached upstream payload version plus the openings
+    version for the sport. The ETag is a hash of the records, so a rebuild that
+    produces the same records keeps the same ETag; the body carries it as
+    "cursor" next to "full": true, like a delta response.
+    """
+    store = get_openings_store()
+    store.refresh()
+    pre = get_precomputed(sport, bookmaker) if POLLER_ENABLED else None
+    if pre is not None:
+        version = ("poll", pre["ver"])
+    elif POLLER_ENABLED and SERVE_PRECOMPUTED_ONLY:
+        raise OddsNotReady(f"{sport}/{bookmaker}")
+    else:
+        data = fetch_odds(sport, bookmaker)
+        # Evicted or re-split in between: version this payload on its own
+        raw = get_cache_entry(odds_cache_key(sport, bookmaker))
+        if raw is None or raw["data"] is not data:
+            raw = {"data": data, "ver": next(_versions)}
+        version = ("raw", raw["ver"], store.sport_version(sport))
+    with _responses_lock:
+        prev = _responses.get((sport, bookmaker))
+    if prev and prev["version"] == version:
+        return prev
+    if pre is not None:
+        snap = pre["snapshot"]
+    else:
+        snap = build_view(store, sport, raw["data"], bookmaker)
+        store.flush_if_needed()
+        # Openings created by this pass are already baked into the snapshot
+        version = ("raw", raw["ver"], store.sport_version(sport))
+    records = snap.to_records()
+    records_json = app.json.dumps(records).encode("utf-8")
+    etag = hashlib.sha1(f"{sport}:{bookmaker}:".encode("utf-8") + records_json).hexdigest()[:24]
+    # The records are serialized once, for the hash and the body
+    head = app.json.dumps({"sport": sport, "bookmaker": bookmaker, "full": True, "cursor": etag})
+    body = head[:-1].encode("utf-8") + b',"records":' + records_json + b"}"
+    view = {
+        "version": version,
+        "snapshot": snap,
+        "body": body,
+        "etag": etag,
+        "last_modified": prev["last_modified"] if prev and prev["etag"] == etag else datetime.now(timezone.utc),
+    }
+    with _responses_lock:
+        _responses[(sport, bookmaker)] = view
+    remember_view(sport, bookmaker, etag, snap)
+    if prev and movement_hub.has_subscribers(sport, bookmaker):
+        movement_hub.publish(sport, bookmaker, diff_records(prev["snapshot"].to_records(), records))
+    return view
+
+# -------- Consensus across bookmakers --------
+# A book is off-market when its no-vig probability is this far from the
+# consensus, or its line differs from the median line
+OFF_MARKET_PROB = float(os.getenv("OFF_MARKET_PROB", "0.02"))
+
+_consensus_lock = threading.Lock()
+_consensus_cache: Dict[Tuple[str, str], Tuple[Any, Dict[str, Any]]] = {}
+
+def event_fingerprint(event: Dict[str, Any]) -> Any:
+    """Cheap change detector: upstream last_update stamps when every book has one,
+    else the raw prices/points."""
+    books = event.get("bookmakers", [])
+    if books and all(bk.get("last_update") for bk in books):
+        return tuple((bk.get("key"), bk.get("last_update")) for bk in books)
+    return tuple(
+        (bk.get("key"), m.get("key"), o.get("name"), o.get("price"), o.get("point"))
+        for bk in books for m in bk.get("markets", []) for o in m.get("outcomes", [])
+    )
+
+def median_price(prices: List[int]) -> Optional[int]:
+    """Median of American prices, taken as implied probabilities: -105 and
+    +105 have a median of +100, not the 0 a plain average gives."""
+    if not prices:
+        return None
+    probs = [p for p in batch_implied_probability([float(p) for p in prices]) if p == p]
+    if not probs:
+        return None
+    return decimal_to_american(1.0 / statistics.median(probs))
+
+def event_consensus(event: Dict[str, Any]) -> Dict[str, Any]:
+    # market -> selection -> [(book, price, point, no-vig prob)]
+    quotes: Dict[str, Dict[str, List[Tuple[str, Optional[int], Optional[float], Optional[float]]]]] = {}
+    for bk in event.get("bookmakers", []):
+        if bk.get("key") not in BOOKMAKERS:
+            continue
+        for m in bk.get("markets", []):
+            if m.get("key") not in MARKET_CODES:
+                continue
+            outcomes = m.get("outcomes", [])
+            prices = [safe_int(o.get("price")) for o in outcomes]
+            probs = batch_implied_probability([_nan(p) for p in prices])
+            total = sum(p for p in probs if p == p)
+            for o, price, prob in zip(outcomes, prices, probs):
+                no_vig = prob / total if total and prob == prob else None
+                quotes.setdefault(m["key"], {}).setdefault(o.get("name"), []).append(
+                    (bk["key"], price, safe_float(o.get("point")), no_vig))
+    markets: Dict[str, Any] = {}
+    for mkey, sels in quotes.items():
+        out = markets[mkey] = {}
+        for sel, qs in sels.items():
+            priced = [q for q in qs if q[1] is not None]
+            best = max((q[1] for q in priced), default=None)
+            points = [q[2] for q in qs if q[2] is not None]
+            probs = [q[3] for q in qs if q[3] is not None]
+            # median_low so the median line is one some book actually offers;
+            # averaging -3 and -3.5 would put every book off-market
+            median_point = statistics.median_low(points) if points else None
+            # Highest spread is best for its side; Over wants the lowest total
+            best_point = (min(points) if sel == "Over" else max(points)) if points else None
+            consensus = statistics.median(probs) if probs else None
+            off = [q[0] for q in qs
+                   if (median_point is not None and q[2] is not None and q[2] != median_point)
+                   or (consensus is not None and q[3] is not None and abs(q[3] - consensus) > OFF_MARKET_PROB)]
+            out[sel] = {
+                "best_price": best,
+                "best_books": [q[0] for q in priced if q[1] == best],
+                "median_price": median_price([q[1] for q in priced]),
+                "best_point": best_point,
+                "median_point": median_point,
+                "no_vig_prob": round(consensus, 4) if consensus is not None else None,
+                "off_market": off,
+                "books": len(qs),
+            }
+    return {
+        "event_id": event.get("id"),
+        "commence_time": event.get("commence_time"),
+        "home_team": event.get("home_team"),
+        "away_team": event.get("away_team"),
+        "markets": markets,
+    }
+
+def sport_consensus(sport: str, events: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+    """Consensus for every event, recomputing only events whose fingerprint changed.
+    Returns (results, recomputed count)."""
+    results, recomputed = [], 0
+    seen = set()
+    for event in events:
+        key = (sport, event.get("id"))
+        seen.add(key)
+        fp = event_fingerprint(event)
+        with _consensus_lock:
+            cached = _consensus_cache.get(key)
+        if cached and cached[0] == fp:
+            results.append(cached[1])
+            continue
+        res = event_consensus(event)
+        recomputed += 1
+        with _consensus_lock:
+            _consensus_cache[key] = (fp, res)
+        results.append(res)
+    with _consensus_lock:
+        for key in [k for k in _consensus_cache if k[0] == sport and k not in seen]:
+            del _consensus_cache[key]
+    results.sort(key=lambda x: x.get("commence_time") or "")
+    return results, recomputed
+
+# -------- Arbitrage / middle scanner --------
+class ArbScanner:
+    """Two-way arbitrage and spread/total middles across bookmakers.
+
+    Each event market is one pass over its quotes into best-price indexes
+    (per outcome, and per (outcome, line) for spreads/totals) instead of
+    comparing every pair of books. Results are cached per event by
+    event_fingerprint, so a rescan only touches changed events.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events: Dict[Tuple[str, str], Tuple[Any, List[Dict[str, Any]]]] = {}
+        self._by_sport: Dict[str, List[Tuple[str, str]]] = {}
+        self.last_scan: Dict[str, float] = {}
+
+    @staticmethod
+    def _arb(sport: str, event: Dict[str, Any], market: str, legs: List[Tuple[str, Optional[float], int, str]]):
+        """legs: (outcome, point, best American price, book). Arb when the
+        implied probabilities of the best prices sum below 1."""
+        probs = batch_implied_probability([float(p) for _, _, p, _ in legs])
+        total = sum(probs)
+        if not total < 1:
+            return None
+        return {
+            "type": "arb", "sport": sport, "event_id": event.get("id"),
+            "commence_time": event.get("commence_time"), "market": market,
+            "edge": round(1 - total, 4),
+            "legs": [{"selection": name, "point": point, "price": price, "bookmaker": book,
+                      "stake_share": round(p / total, 4)}
+                     for (name, point, price, book), p in zip(legs, probs)],
+        }
+
+    def scan_event(self, sport: str, event: Dict[str, Any]) -> List[Dict[str, Any]]:
+        best: Dict[str, Dict[str, Tuple[int, str]]] = {}                       # market -> outcome -> (price, book)
+        best_line: Dict[str, Dict[Tuple[str, float], Tuple[int, str]]] = {}   # market -> (outcome, point) -> (price, book)
+        for bk in event.get("bookmakers", []):
+            book = bk.get("key")
+            for m in bk.get("markets", []):
+                mkey = m.get("key")
+                for o in m.get("outcomes", []):
+                    price = safe_int(o.get("price"))
+                    if price is None or price == 0:
+                        continue
+                    name = o.get("name")
+                    if mkey == "h2h":
+                        cur = best.setdefault(mkey, {}).get(name)
+                        if cur is None or price > cur[0]:
+                            best[mkey][name] = (price, book)
+                    elif mkey in ("spreads", "totals"):
+                        point = safe_float(o.get("point"))
+                        if point is None:
+                            continue
+                        k = (name, point)
+                        cur = best_line.setdefault(mkey, {}).get(k)
+                        if cur is None or price > cur[0]:
+                            best_line[mkey][k] = (price, book)
+        found = []
+        h2h = best.get("h2h", {})
+        if len(h2h) >= 2:
+            arb = self._arb(sport, event, "h2h", [(n, None, p, b) for n, (p, b) in h2h.items()])
+            if arb:
+                found.append(arb)
+        for mkey, lines in best_line.items():
+            sides: Dict[str, List[Tuple[float, int, str]]] = {}
+            for (name, point), (price, book) in lines.items():
+                sides.setdefault(name, []).append((point, price, book))
+            if len(sides) != 2:
+                continue
+            (a_name, a_lines), (b_name, b_lines) = sides.items()
+            if mkey == "totals" and a_name != "Over":
+                (a_name, a_lines), (b_name, b_lines) = (b_name, b_lines), (a_name, a_lines)
+            # Same-line arbs: spreads pair +p with -p, totals pair Over p with Under p
+            for point, price, book in a_lines:
+                other = lines.get((b_name, -point if mkey == "spreads" else point))
+                if other:
+                    arb = self._arb(sport, event, mkey, [(a_name, point, price, book), (b_name, -point if mkey == "spreads" else point, *other)])
+                    if arb:
+                        found.append(arb)
+            # Middles: the most favourable line on each side leaves a gap both can win.
+            # Both legs win only if the margin (a's side) or total lands strictly inside
+            # (lo, hi); scores are whole numbers, so -3/+3.5 or Over 44.5/Under 45 can
+            # at best win one leg and push the other: a "push_middle".
+            if mkey == "spreads":
+                a = max(a_lines)
+                b = max(b_lines)
+                lo, hi = -a[0], b[0]
+            else:
+                a = min(a_lines)            # Over: lowest total
+                b = max(b_lines)            # Under: highest total
+                lo, hi = a[0], b[0]
+            if hi <= lo:
+                continue
+            inside = math.ceil(hi) - math.floor(lo) - 1
+            push_on = [int(x) for x in (lo, hi) if float(x).is_integer()]
+            if inside <= 0 and not push_on:
+                continue
+            middle = {
+                "type": "middle" if inside > 0 else "push_middle", "sport": sport, "event_id": event.get("id"),
+                "commence_time": event.get("commence_time"), "market": mkey,
+                "edge": round(hi - lo, 2),
+                "legs": [{"selection": a_name, "point": a[0], "price": a[1], "bookmaker": a[2]},
+                         {"selection": b_name, "point": b[0], "price": b[1], "bookmaker": b[2]}],
+            }
+            if inside <= 0:
+                middle["push_on"] = push_on
+            found.append(middle)
+        return found
+
+    def update(self, sport: str, events: List[Dict[str, Any]]):
+        keys = []
+        for event in events:
+            key = (sport, event.get("id"))
+            keys.append(key)
+            fp = event_fingerprint(event)
+            cached = self._events.get(key)
+            if cached and cached[0] == fp:
+                continue
+            found = self.scan_event(sport, event)
+            with self._lock:
+                self._events[key] = (fp, found)
+        with self._lock:
+            for key in set(self._by_sport.get(sport, [])) - set(keys):
+                self._events.pop(key, None)
+            self._by_sport[sport] = keys
+            self.last_scan[sport] = time.time()
+
+    def results(self, sports: Optional[List[str]] = None) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            found = [r for sport, keys in self._by_sport.items() if sports is None or sport in sports
+                     for key in keys for r in self._events.get(key, (None, []))[1]]
+        arbs = sorted((r for r in found if r["type"] == "arb"), key=lambda r: -r["edge"])
+        middles = sorted((r for r in found if r["type"] == "middle"), key=lambda r: -r["edge"])
+        push_middles = sorted((r for r in found if r["type"] == "push_middle"), key=lambda r: -r["edge"])
+        return {"arbs": arbs, "middles": middles, "push_middles": push_middles}
+
+arb_scanner = ArbScanner()
 
 # ------------------ Routes ------------------
 
@@ -335,9 +2424,8 @@ def root():
 @app.route("/sports")
 def sports():
     try:
-        r = HTTP.get(f"{BASE}/sports", params={"apiKey": API_KEY, "all": "false"}, timeout=15)
-        r.raise_for_status()
-        arr = r.json()
+        # Listing sports does not count against the quota
+        arr = upstream_get("/sports", {"apiKey": API_KEY, "all": "false"}, timeout=15, metered=False)
         keys = [x.get("key") for x in arr if x.get("active")]
         mapped = []
         for k in keys:
@@ -352,36 +2440,230 @@ def sports():
 
 @app.route("/bookmakers")
 def bookmakers():
-    return jsonify({"bookmakers": BOOKMAKERS, "default": DEFAULT_BOOKMAKER})
+    return jsonify({"bookmakers": BOOKMAKERS, "default": DEFAULT_BOOKMAKER, "stream": STREAM_MAX_CLIENTS > 0})
+
+# Bounded pool for the multi-sport /odds endpoint
+FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS", "8"))
+_fanout_pool = ThreadPoolExecutor(max_workers=FANOUT_WORKERS, thread_name_prefix="odds-fanout")
+
+def _odds_combo(sport: str, bookmaker: str) -> List[Dict[str, Any]]:
+    return [dict(r, sport=sport, bookmaker=bookmaker) for r in odds_view(sport, bookmaker)["snapshot"].to_records()]
+
+@app.route("/odds")
+def odds_multi():
+    """/odds?sports=a,b,c&bookmakers=x,y: every combination fetched and normalized
+    concurrently, merged and sorted by commence_time. A failing combination is
+    reported under "errors" without failing the rest."""
+    sports = [s for s in request.args.get("sports", "").split(",") if s]
+    books = [b for b in request.args.get("bookmakers", DEFAULT_BOOKMAKER).split(",") if b]
+    if not sports:
+        return jsonify({"error": "missing sports"}), 400
+    if not API_KEY:
+        return jsonify({"error": "API_KEY missing"}), 500
+    errors = [{"sport": s, "error": "Unsupported sport"} for s in sports if s not in ALLOWED_SPORTS]
+    errors += [{"bookmaker": b, "error": "Unsupported bookmaker"} for b in books if b not in BOOKMAKERS]
+    combos = [(s, b) for s in dict.fromkeys(sports) if s in ALLOWED_SPORTS
+              for b in dict.fromkeys(books) if b in BOOKMAKERS]
+    futures = {_fanout_pool.submit(_odds_combo, s, b): (s, b) for s, b in combos}
+    records = []
+    for fut, (s, b) in futures.items():
+        try:
+            records.extend(fut.result())
+        except requests.HTTPError as e:
+            status = e.response.status_code if e.response is not None else 500
+            errors.append({"sport": s, "bookmaker": b, "error": "Odds API error", "status": status})
+        except OddsNotReady:
+            errors.append({"sport": s, "bookmaker": b, "error": "Odds not ready yet"})
+        except QuotaExhausted as e:
+            errors.append({"sport": s, "bookmaker": b, "error": "Odds API quota exhausted", "details": str(e)})
+        except Exception as e:
+            errors.append({"sport": s, "bookmaker": b, "error": "Server error", "details": str(e)})
+    records.sort(key=lambda x: x.get("commence_time") or "")
+    return jsonify({"sports": sports, "bookmakers": books, "records": records, "errors": errors})
+
+@app.route("/consensus/<sport>")
+def consensus(sport: str):
+    """Per selection across BOOKMAKERS: best price (and which books have it),
+    best line, median price and line, median no-vig probability, and off-market books."""
+    if sport not in ALLOWED_SPORTS:
+        return jsonify({"error": "Unsupported sport"}), 400
+    if not API_KEY:
+        return jsonify({"error": "API_KEY missing"}), 500
+    try:
+        events, recomputed = sport_consensus(sport, fetch_odds_all(sport))
+        return jsonify({"sport": sport, "bookmakers": BOOKMAKERS, "events": events, "recomputed": recomputed})
+    except QuotaExhausted as e:
+        return jsonify({"error": "Odds API quota exhausted", "details": str(e)}), 429
+    except requests.HTTPError as e:
+        status = e.response.status_code if e.response is not None else 500
+        return jsonify({"error": "Odds API error", "status": status, "details": str(e)}), status
+    except Exception as e:
+        return jsonify({"error": "Server error", "details": str(e)}), 500
+
+@app.route("/scanner")
+def scanner():
+    """Arbs (edge = 1 - sum of implied probabilities), middles (edge = gap in
+    points) and push_middles (a gap with no whole number strictly inside, so one
+    leg can only push), best first, for ?sports=a,b (default all). Sports the poller has not
+    scanned within CACHE_SECONDS are rescanned from the multi-book cache."""
+    sports = [s for s in request.args.get("sports", "").split(",") if s] or ALLOWED_SPORTS
+    bad = [s for s in sports if s not in ALLOWED_SPORTS]
+    if bad:
+        return jsonify({"error": "Unsupported sport", "sports": bad}), 400
+    if not API_KEY:
+        return jsonify({"error": "API_KEY missing"}), 500
+    stale = [s for s in sports if time.time() - arb_scanner.last_scan.get(s, 0) > CACHE_SECONDS]
+    futures = {_fanout_pool.submit(lambda s=s: arb_scanner.update(s, fetch_odds_all(s))): s for s in stale}
+    errors = []
+    for fut, sport in futures.items():
+        try:
+            fut.result()
+        except Exception as e:
+            errors.append({"sport": sport, "error": str(e)})
+    return jsonify({"sports": sports, **arb_scanner.results(sports), "errors": errors})
 
 @app.route("/odds/<sport>")
 def odds_for_sport(sport: str):
     if sport not in ALLOWED_SPORTS:
         return jsonify({"error": "Unsupported sport"}), 400
     bookmaker = request.args.get("bookmaker", DEFAULT_BOOKMAKER)
+    if bookmaker not in BOOKMAKERS:
+        return jsonify({"error": "Unsupported bookmaker"}), 400
     if not API_KEY:
         return jsonify({"error": "API_KEY missing"}), 500
+    since = request.args.get("since")
     try:
-        data = fetch_odds(sport, bookmaker)
-        store = OpeningsStore()
-        records = [normalize_event_record(store, sport, e, bookmaker) for e in data]
-        records.sort(key=lambda x: x.get("commence_time") or "")
-        store.flush_if_needed()
-        return jsonify({"sport": sport, "bookmaker": bookmaker, "records": records})
+        view = odds_view(sport, bookmaker)
+        old = get_past_view(sport, bookmaker, since) if since else None
+        if old is not None:
+            # Cursor still in the ring: send only what changed since then
+            delta = delta_records(old.to_records(), view["snapshot"].to_records()) if since != view["etag"] else \
+                {"added": [], "removed": [], "changed": []}
+            resp = jsonify({"sport": sport, "bookmaker": bookmaker, "full": False,
+                            "since": since, "cursor": view["etag"], **delta})
+            resp.headers["X-Odds-Cursor"] = view["etag"]
+            resp.cache_control.no_cache = True
+            return resp
+        # No cursor, or it aged out: full snapshot (cursor also in X-Odds-Cursor / ETag)
+        resp = app.response_class(view["body"], mimetype="application/json")
+        resp.headers["X-Odds-Cursor"] = view["etag"]
+        resp.set_etag(view["etag"])
+        resp.last_modified = view["last_modified"]
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
+    except OddsNotReady:
+        return jsonify({"error": "Odds not ready yet", "retry_after": POLL_SECONDS}), 503
+    except QuotaExhausted as e:
+        return jsonify({"error": "Odds API quota exhausted", "details": str(e)}), 429
     except requests.HTTPError as e:
-        status = e.response.status_code if e.response else 500
+        status = e.response.status_code if e.response is not None else 500
         return jsonify({"error": "Odds API error", "status": status, "details": str(e)}), status
     except Exception as e:
         return jsonify({"error": "Server error", "details": str(e)}), 500
 
+@app.route("/stream/odds/<sport>")
+def stream_odds(sport: str):
+    """Server-Sent Events: a "snapshot" of the records, then "moves" with only the
+    selections whose live price/point changed. Every connection re-checks
+    odds_view each STREAM_POLL_SECONDS; the shared cache makes that one upstream
+    refresh per TTL however many clients are connected."""
+    if sport not in ALLOWED_SPORTS:
+        return jsonify({"error": "Unsupported sport"}), 400
+    bookmaker = request.args.get("bookmaker", DEFAULT_BOOKMAKER)
+    if bookmaker not in BOOKMAKERS:
+        return jsonify({"error": "Unsupported bookmaker"}), 400
+    if not API_KEY:
+        return jsonify({"error": "API_KEY missing"}), 500
+
+    if STREAM_MAX_CLIENTS <= 0:
+        return jsonify({"error": "Streaming disabled"}), 503
+    q = movement_hub.subscribe(sport, bookmaker)
+    if q is None:
+        resp = jsonify({"error": "Too many streams", "retry_after": STREAM_MAX_SECONDS})
+        resp.headers["Retry-After"] = str(int(STREAM_MAX_SECONDS))
+        return resp, 503
+
+    def gen():
+        # The stream closes after STREAM_MAX_SECONDS; "retry" sets the client's reconnect delay
+        deadline = time.time() + STREAM_MAX_SECONDS
+        yield f"retry: {STREAM_RETRY_MS}\n\n"
+        resync = True
+        while True:
+            if resync:
+                try:
+                    view = odds_view(sport, bookmaker)
+                    yield _sse("snapshot", {"sport": sport, "bookmaker": bookmaker, "records": view["snapshot"].to_records()})
+                    resync = False
+                except Exception as e:
+                    yield _sse("error", {"error": str(e)})
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                return
+            try:
+                moves = q.get(timeout=min(STREAM_POLL_SECONDS, remaining))
+            except queue.Empty:
+                try:
+                    odds_view(sport, bookmaker)
+                except Exception as e:
+                    dlog("stream_refresh_error", sport=sport, bookmaker=bookmaker, error=str(e))
+                yield ": keepalive\n\n"
+                continue
+            if moves is None:
+                resync = True
+                continue
+            yield _sse("moves", {"sport": sport, "bookmaker": bookmaker, "moves": moves})
+
+    resp = app.response_class(gen(), mimetype="text/event-stream",
+                              headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    # Frees the slot however the response ends, even if the body is never iterated
+    resp.call_on_close(lambda: movement_hub.unsubscribe(sport, bookmaker, q))
+    return resp
+
+@app.route("/history/<sport>/<event_id>")
+def history(sport: str, event_id: str):
+    """Moves for one event: ?hours=2 (default) or ?since=&until= unix seconds,
+    optionally narrowed by ?market=h2h|spreads|totals and ?bookmaker=."""
+    if sport not in ALLOWED_SPORTS:
+        return jsonify({"error": "Unsupported sport"}), 400
+    now = time.time()
+    try:
+        until = float(request.args.get("until", now))
+        since = float(request.args["since"]) if "since" in request.args else \
+            until - float(request.args.get("hours", "2")) * 3600
+    except ValueError:
+        return jsonify({"error": "since/until/hours must be numbers"}), 400
+    selections = line_history.query(sport, event_id, since, until,
+                                    market=request.args.get("market"), bookmaker=request.args.get("bookmaker"))
+    return jsonify({"sport": sport, "event_id": event_id, "since": int(since), "until": int(until),
+                    "selections": selections})
+
+@app.route("/alerts")
+def alerts():
+    """Sharp and steam alerts, oldest first; poll with ?since_id=<last id seen>."""
+    try:
+        since_id = int(request.args.get("since_id", "0"))
+    except ValueError:
+        return jsonify({"error": "since_id must be an integer"}), 400
+    items = move_detector.recent(since_id, request.args.get("sport"))
+    return jsonify({"alerts": items, "last_id": items[-1]["id"] if items else since_id})
+
 @app.route("/debug/peek")
 def debug_peek():
+    """One opening by ?key=, or every opening held for ?sport= (narrowed by
+    event_id, market and bookmaker) via the store's index."""
     if not OPENINGS_DEBUG:
         return jsonify({"error": "debug disabled"}), 403
     key = request.args.get("key")
+    sport = request.args.get("sport")
+    if not key and not sport:
+        return jsonify({"error": "missing key or sport"}), 400
+    store = get_openings_store()
     if not key:
-        return jsonify({"error": "missing key"}), 400
-    store = OpeningsStore()
+        store.refresh()
+        keys = store.keys_for(sport, event_id=request.args.get("event_id"),
+                              market=request.args.get("market"), bookmaker=request.args.get("bookmaker"))
+        return jsonify({"source": "index", "sport": sport, "count": len(keys),
+                        "openings": {k: store.get(k) for k in keys}})
     val = store.get(key)
     if val:
         return jsonify({"source": "local_or_redis", "key": key, "value": val})
@@ -398,6 +2680,26 @@ def routes():
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
+@app.route("/metrics/cache")
+def metrics_cache():
+    with _cache_lock:
+        stats = dict(_cache_stats)
+        stats.update(entries=len(_cache), bytes=_cache.bytes, max_bytes=_cache.max_bytes,
+                     max_entries=_cache.max_entries, inflight=len(_inflight), mode=CACHE_MODE,
+                     shared=type(_shared_cache).__name__ if _shared_cache else None)
+    return jsonify(stats)
+
+@app.route("/metrics/poller")
+def metrics_poller():
+    stats = dict(poller.stats)
+    stats.update(enabled=POLLER_ENABLED, combos=len(poller.combos),
+                 calls_last_hour=len(poller._calls), budget_per_hour=poller.budget_per_hour)
+    return jsonify(stats)
+
+@app.route("/metrics/quota")
+def metrics_quota():
+    return jsonify(quota.metrics())
+
 @app.route("/health")
 def health():
     return jsonify({"ok": True})
@@ -0,0 +1,214 @@
+"""
+Asyncio variant of the app6 odds service (aiohttp server + aiohttp client).
+
+Same routes as app6 (/sports, /bookmakers, /odds/<sport>, /health) and the same
+normalization and openings store. Upstream calls never block a thread, so one
+process can hold hundreds of slow requests open; the openings lookup (app6's
+Redis client, the WAL file, line history) is blocking and runs in the default
+executor.
+
+  API_KEY=... python app6_async.py            # PORT defaults to 5051
+"""
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Set
+
+import aiohttp
+from aiohttp import web
+
+import app6
+from app6 import (
+    ALLOWED_SPORTS, BOOKMAKERS, CACHE_MODE, CACHE_SECONDS, DEFAULT_BOOKMAKER,
+    DROP_STARTED_EVENTS, MARKETS, MULTI_BOOK_FETCH, ODDS_FORMAT, REGION,
+    STALE_SECONDS, QuotaExhausted, build_records, drop_started, get_openings_store, log, odds_ttl, quota,
+    split_by_bookmaker, upstream_cost,
+)
+
+UPSTREAM_TIMEOUT = aiohttp.ClientTimeout(total=25)
+
+
+class AsyncCache:
+    """TTL cache with single-flight loads and stale-while-revalidate, like app6.cached_fetch."""
+    def __init__(self):
+        self._data: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # Background refresh tasks, held so they are not garbage-collected mid-run
+        self._tasks: Set[asyncio.Task] = set()
+        self.stats = {"hit": 0, "miss": 0, "stale": 0, "coalesced": 0, "refresh_error": 0}
+
+    def set(self, key: str, data: Any, ttl: Optional[float] = None, ts: Optional[float] = None):
+        self._data[key] = {"data": data, "ts": time.time() if ts is None else ts,
+                           "ttl": CACHE_SECONDS if ttl is None else ttl}
+
+    def entry(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._data.get(key)
+
+    async def _load(self, key: str, loader, fut: asyncio.Future, background: bool, ttl=None):
+        try:
+            data = await loader()
+            self.set(key, data, ttl(data) if ttl else None)
+            fut.set_result(data)
+        except Exception as e:
+            # Waiters coalesced onto the load see its error, as in app6._run_flight
+            fut.set_exception(e)
+            if background:
+                self.stats["refresh_error"] += 1
+                log.warning("background refresh of %s failed: %s", key, e)
+                fut.exception()  # nobody may be waiting; don't log it again at GC
+        finally:
+            self._inflight.pop(key, None)
+
+    async def fetch(self, key: str, loader, ttl=None) -> Any:
+        entry = self._data.get(key)
+        age = time.time() - entry["ts"] if entry else None
+        if entry and age <= entry["ttl"]:
+            self.stats["hit"] += 1
+            return entry["data"]
+        fut = self._inflight.get(key)
+        if entry and CACHE_MODE == "swr" and age <= entry["ttl"] + STALE_SECONDS:
+            self.stats["stale"] += 1
+            if fut is None:
+                fut = self._inflight[key] = asyncio.get_running_loop().create_future()
+                task = asyncio.create_task(self._load(key, loader, fut, True, ttl))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            return entry["data"]
+        if fut is not None:
+            self.stats["coalesced"] += 1
+            return await asyncio.shield(fut)
+        self.stats["miss"] += 1
+        fut = self._inflight[key] = asyncio.get_running_loop().create_future()
+        await self._load(key, loader, fut, False, ttl)
+        return fut.result()
+
+
+cache = AsyncCache()
+
+
+async def fetch_odds_upstream(session: aiohttp.ClientSession, sport: str, bookmakers: str) -> Any:
+    params = {
+        "apiKey": app6.API_KEY,
+        "regions": REGION,
+        "markets": ",".join(MARKETS),
+        "bookmakers": bookmakers,
+        "oddsFormat": ODDS_FORMAT,
+    }
+    if DROP_STARTED_EVENTS:
+        params["commenceTimeFrom"] = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+    reserved = quota.check(upstream_cost(params))
+    try:
+        async with session.get(f"{app6.BASE}/sports/{sport}/odds", params=params, timeout=UPSTREAM_TIMEOUT) as r:
+            quota.record(r, sport, reserved)
+            reserved = 0
+            r.raise_for_status()
+            data = await r.json()
+    finally:
+        quota.release(reserved)
+    if DROP_STARTED_EVENTS:
+        data = drop_started(data)
+    quota.note_events(sport, data)
+    return data
+
+
+async def fetch_odds(session: aiohttp.ClientSession, sport: str, bookmaker: str) -> Any:
+    if MULTI_BOOK_FETCH and bookmaker in BOOKMAKERS:
+        # Per-book entries are split from the odds_all fetch they carry the ts of,
+        # as in app6.fetch_odds, so a stale odds_all is never stamped fresh
+        events = await cache.fetch(
+            f"odds_all:{sport}", lambda: fetch_odds_upstream(session, sport, ",".join(BOOKMAKERS)), odds_ttl)
+        parent = cache.entry(f"odds_all:{sport}")
+        if parent is None or parent["data"] is not events:
+            return split_by_bookmaker(events, [bookmaker])[bookmaker]
+        mine = cache.entry(app6.odds_cache_key(sport, bookmaker))
+        if mine is not None and mine["ts"] == parent["ts"]:
+            return mine["data"]
+        per_book = split_by_bookmaker(events, BOOKMAKERS)
+        for b, evs in per_book.items():
+            cache.set(app6.odds_cache_key(sport, b), evs, parent["ttl"], parent["ts"])
+        return per_book[bookmaker]
+    return await cache.fetch(app6.odds_cache_key(sport, bookmaker),
+                             lambda: fetch_odds_upstream(session, sport, bookmaker), odds_ttl)
+
+
+def openings_records(sport: str, data: Any, bookmaker: str) -> List[Dict[str, Any]]:
+    """Normalize against the openings store and flush it. Blocking (MGET through
+    app6's Redis client, WAL and history file writes): call via run_in_executor."""
+    store = get_openings_store()
+    records = build_records(store, sport, data, bookmaker)
+    store.flush_if_needed()
+    return records
+
+
+# ------------------ Routes ------------------
+
+routes = web.RouteTableDef()
+
+
+@routes.get("/sports")
+async def sports(request: web.Request):
+    try:
+        async with request.app["http"].get(
+            f"{app6.BASE}/sports", params={"apiKey": app6.API_KEY, "all": "false"},
+            timeout=aiohttp.ClientTimeout(total=15),
+        ) as r:
+            # Listing sports does not count against the quota, but its headers are read
+            quota.record(r)
+            r.raise_for_status()
+            arr = await r.json()
+        mapped = ["americanfootball_ncaa" if x.get("key") == "americanfootball_ncaaf" else x.get("key")
+                  for x in arr if x.get("active")]
+        return web.json_response({"sports": [k for k in mapped if k in ALLOWED_SPORTS]})
+    except Exception:
+        return web.json_response({"sports": ALLOWED_SPORTS, "note": "fallback"})
+
+
+@routes.get("/bookmakers")
+async def bookmakers(request: web.Request):
+    return web.json_response({"bookmakers": BOOKMAKERS, "default": DEFAULT_BOOKMAKER})
+
+
+@routes.get("/odds/{sport}")
+async def odds_for_sport(request: web.Request):
+    sport = request.match_info["sport"]
+    if sport not in ALLOWED_SPORTS:
+        return web.json_response({"error": "Unsupported sport"}, status=400)
+    bookmaker = request.query.get("bookmaker", DEFAULT_BOOKMAKER)
+    if bookmaker not in BOOKMAKERS:
+        return web.json_response({"error": "Unsupported bookmaker"}, status=400)
+    if not app6.API_KEY:
+        return web.json_response({"error": "API_KEY missing"}, status=500)
+    session = request.app["http"]
+    try:
+        data = await fetch_odds(session, sport, bookmaker)
+        records = await asyncio.get_running_loop().run_in_executor(
+            None, openings_records, sport, data, bookmaker)
+        return web.json_response({"sport": sport, "bookmaker": bookmaker, "records": records})
+    except QuotaExhausted as e:
+        return web.json_response({"error": "Odds API quota exhausted", "details": str(e)}, status=429)
+    except aiohttp.ClientResponseError as e:
+        return web.json_response({"error": "Odds API error", "status": e.status, "details": str(e)}, status=e.status)
+    except Exception as e:
+        return web.json_response({"error": "Server error", "details": str(e)}, status=500)
+
+
+@routes.get("/health")
+async def health(request: web.Request):
+    return web.json_response({"ok": True})
+
+
+async def _open_http(app: web.Application):
+    app["http"] = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=200))
+    yield
+    await app["http"].close()
+
+
+def make_app() -> web.Application:
+    app = web.Application()
+    app.add_routes(routes)
+    app.cleanup_ctx.append(_open_http)
+    return app
+
+
+if __name__ == "__main__":
+    web.run_app(make_app(), host="0.0.0.0", port=int(os.getenv("PORT", "5051")))
@@ -7,6 +7,8 @@ from datetime import datetime
 import pytz
 import json
 
+from redis_client import make_redis_client
+
 app = Flask(__name__, template_folder="templates", static_folder="static")
 CORS(app)
 
@@ -38,31 +40,27 @@ def get_redis_credentials():
     return redis_url, token
 
 
-def save_opening_line(redis_url, headers, key, value):
-    # Save only if key doesn't exist
-    # Upstash REST API supports NX param to set only if key does not exist: ?nx=true
-    url = f"{redis_url}/set/{key}?nx=true"
-    payload = json.dumps({"value": value})
-    try:
-        res = requests.post(url, headers=headers, data=payload)
-        # 200 means success, 409 or empty means key exists already (set only if not exists)
-        print(f"[Redis SET] {key} = {value} → {res.status_code} {res.text}")
-        return res.status_code == 200
-    except Exception as e:
-        print("[Redis save error]", e)
-        return False
+# Native RESP connection pool for a redis:// REDIS_URL, else the REST endpoint on a pooled session
+redis_client = make_redis_client(*get_redis_credentials())
+
 
+def get_or_set_opening_lines(entries):
+    """Record openings for many keys in one round trip and return what is stored.
 
-def batch_get_opening_lines(redis_url, headers, keys):
-    url = f"{redis_url}/mget"
+    `entries` is a list of (key, live_value). Keys with a live value are stored
+    only if new (SET NX GET), so concurrent workers all agree on the first
+    writer; keys without one are just read. The result is the stored JSON
+    string per key (our own payload where we won), or None on failure.
+    """
+    if not entries:
+        return []
     try:
-        payload = json.dumps(keys)
-        res = requests.post(url, headers=headers, data=payload)
-        if res.status_code == 200:
-            return res.json().get("result", [])
+        return redis_client.get_or_set_many(
+            [(key, None if value is None else json.dumps({"value": value})) for key, value in entries]
+        )
     except Exception as e:
-        print("[Redis batch get error]", e)
-    return [None] * len(keys)
+        print("[Redis get-or-set error]", e)
+    return [None] * len(entries)
 
 
 def to_american(decimal):
@@ -128,15 +126,9 @@ def odds(sport):
     if sport not in ALLOWED_SPORTS:
         return jsonify({"error": "Sport not supported"}), 400
 
-    redis_url, redis_token = get_redis_credentials()
-    if not redis_url or not redis_token:
+    if redis_client is None:
         return jsonify({"error": "Redis credentials not configured properly"}), 500
 
-    headers = {
-        "Authorization": f"Bearer {redis_token}",
-        "Content-Type": "application/json"
-    }
-
     data = get_odds_cached(sport, bookmaker, MARKETS)
     if data is None:
         return jsonify({"error": "Failed to fetch odds"}), 500
@@ -144,8 +136,9 @@ def odds(sport):
     eastern = pytz.timezone("US/Eastern")
     results = []
 
-    # Prepare Redis keys for batch fetching opening odds/points
+    # Prepare Redis keys (and live values) for storing/fetching opening odds/points in one batch
     redis_keys = []
+    live_values = []
     for game in data:
         for bm in game["bookmakers"]:
             if bm["key"] != bookmaker:
@@ -157,8 +150,10 @@ def odds(sport):
                     team = outcome["name"]
                     redis_keys.append(f"{sport}:{game['id']}:{market['key']}:{team}:open_odds")
                     redis_keys.append(f"{sport}:{game['id']}:{market['key']}:{team}:open_point")
+                    live_values.append(outcome.get("price"))
+                    live_values.append(outcome.get("point"))
 
-    redis_results = batch_get_opening_lines(redis_url, headers, redis_keys)
+    redis_results = get_or_set_opening_lines(list(zip(redis_keys, live_values)))
     redis_values = dict(zip(redis_keys, redis_results))
 
     for game in data:
@@ -203,21 +198,14 @@ def odds(sport):
                         except Exception as e:
                             print(f"[DEBUG] Error parsing open_point for {point_key}: {e}")
 
-                    # Save opening odds ONLY if none already stored
+                    # Redis unreachable: fall back to the live line as the opening
                     if open_odds is None and live_decimal is not None:
-                        print(f"[DEBUG] Saving opening odds for {odds_key}: {live_decimal}")
-                        save_opening_line(redis_url, headers, odds_key, live_decimal)
+                        print(f"[DEBUG] No stored opening odds for {odds_key}, using live {live_decimal}")
                         open_odds = live_decimal
-                    else:
-                        print(f"[DEBUG] Using existing opening odds for {odds_key}: {open_odds}")
 
-                    # Save opening point ONLY if none already stored
                     if open_point is None and point is not None:
-                        print(f"[DEBUG] Saving opening point for {point_key}: {point}")
-                        save_opening_line(redis_url, headers, point_key, point)
+                        print(f"[DEBUG] No stored opening point for {point_key}, using live {point}")
                         open_point = point
-                    else:
-                        print(f"[DEBUG] Using existing opening point for {point_key}: {open_point}")
 
                     # Calculate difference for spreads/totals by point movement
                     diff = "+0"
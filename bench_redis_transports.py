@@ -0,0 +1,109 @@
+"""
+Benchmark the two openings transports in redis_client.py against a local
+redis-server: native RESP over a connection pool vs the REST client.
+
+The REST side goes through fake_upstash.py forwarding to the same Redis
+(--backend), so both see the same data and server; pass --rest-url and
+--rest-token to point it at a real Upstash database instead.
+
+  redis-server --save "" --port 6379 &
+  python bench_redis_transports.py --redis-url redis://127.0.0.1:6379/15 --requests 2000 --threads 8
+
+Reports ops/sec and per-request p50/p99 latency for GET, MGET (100 keys),
+SETNX and get_or_set_many (200 keys, half new) on each transport. Keys are
+written under bench:* in the given database and deleted afterwards.
+"""
+import argparse
+import json
+import statistics
+import threading
+import time
+import uuid
+
+import fake_upstash
+from redis_client import NativeRedis, RestRedis
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--redis-url", default="redis://127.0.0.1:6379/15")
+ap.add_argument("--rest-url", default=None)
+ap.add_argument("--rest-token", default="bench")
+ap.add_argument("--requests", type=int, default=2000, help="requests per operation per transport")
+ap.add_argument("--threads", type=int, default=8)
+args = ap.parse_args()
+
+native = NativeRedis(args.redis_url, pool_size=args.threads)
+native.client.ping()
+if args.rest_url:
+    rest = RestRedis(args.rest_url, args.rest_token, pool_size=args.threads)
+else:
+    server, _, url = fake_upstash.serve(backend=args.redis_url)
+    rest = RestRedis(url, args.rest_token, pool_size=args.threads)
+
+RUN = uuid.uuid4().hex[:8]
+VALUE = json.dumps({"opening_price": -110, "opening_point": -3.5, "ts": int(time.time())}, separators=(",", ":"))
+SEEDED = [f"bench:{RUN}:seed:{i}" for i in range(1000)]
+native.pipeline([["SET", k, VALUE] for k in SEEDED])
+
+
+def op_get(client, i, tag):
+    client.get(SEEDED[i % len(SEEDED)])
+
+
+def op_mget(client, i, tag):
+    start = (i * 100) % (len(SEEDED) - 100)
+    client.mget(SEEDED[start:start + 100])
+
+
+def op_setnx(client, i, tag):
+    client.setnx(f"bench:{RUN}:{tag}:nx:{i}", VALUE)
+
+
+def op_get_or_set(client, i, tag):
+    start = (i * 100) % (len(SEEDED) - 100)
+    fresh = [(f"bench:{RUN}:{tag}:gos:{i}:{j}", VALUE) for j in range(100)]
+    client.get_or_set_many([(k, VALUE) for k in SEEDED[start:start + 100]] + fresh)
+
+
+def run(client, tag, fn):
+    latencies = []
+    lock = threading.Lock()
+    counter = iter(range(args.requests))
+
+    def worker():
+        mine = []
+        while True:
+            with lock:
+                i = next(counter, None)
+            if i is None:
+                break
+            t0 = time.perf_counter()
+            fn(client, i, tag)
+            mine.append(time.perf_counter() - t0)
+        with lock:
+            latencies.extend(mine)
+
+    threads = [threading.Thread(target=worker) for _ in range(args.threads)]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "ops_per_s": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p99_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))] * 1000, 3),
+    }
+
+
+try:
+    print(f"{args.requests} requests per op, {args.threads} threads, redis {args.redis_url}")
+    for name, fn in (("GET", op_get), ("MGET x100", op_mget), ("SETNX", op_setnx),
+                     ("get_or_set_many x200", op_get_or_set)):
+        for client in (native, rest):
+            print(f"{name:22s} {client.kind:6s} {json.dumps(run(client, client.kind, fn))}")
+finally:
+    keys = list(native.client.scan_iter(f"bench:{RUN}:*", count=1000))
+    for i in range(0, len(keys), 1000):
+        native.client.delete(*keys[i:i + 1000])
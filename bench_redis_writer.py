@@ -0,0 +1,49 @@
+"""
+Benchmark the openings Redis writer: one /setnx GET per key (old worker) vs
+one /pipeline POST per 500-key batch (current worker), against fake_upstash.py.
+
+  python bench_redis_writer.py --keys 5000 --latency-ms 5
+"""
+import argparse
+import json
+import os
+import time
+
+import fake_upstash
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--keys", type=int, default=5000)
+ap.add_argument("--latency-ms", type=float, default=5.0)
+args = ap.parse_args()
+
+server, redis, url = fake_upstash.serve(latency_ms=args.latency_ms)
+os.environ["UPSTASH_REDIS_REST_URL"] = url
+os.environ["UPSTASH_REDIS_REST_TOKEN"] = "bench"
+import app6  # noqa: E402  (reads the env above at import)
+
+
+def make_items(prefix):
+    v = json.dumps({"opening_price": -110, "ts": int(time.time())}, separators=(",", ":"))
+    return [(f"open:bench:{prefix}{i}:h2h:team:draftkings", v, 0) for i in range(args.keys)]
+
+
+def per_key(items):
+    for k, v, _ in items:
+        app6.HTTP.get(f"{url}/setnx/{k}/{v}", headers={"Authorization": "Bearer bench"}, timeout=5)
+
+
+def pipelined(items):
+    for i in range(0, len(items), app6.REDIS_BATCH_SIZE):
+        app6._redis_setnx_batch(items[i:i + app6.REDIS_BATCH_SIZE])
+
+
+for name, fn in (("per-key /setnx", per_key), ("pipelined", pipelined)):
+    items = make_items(name[0])
+    calls = redis.calls
+    t0 = time.perf_counter()
+    fn(items)
+    dt = time.perf_counter() - t0
+    print(f"{name:16s} {len(items):6d} keys  {dt:7.3f}s  {len(items) / dt:10.0f} keys/s  "
+          f"{redis.calls - calls} HTTP calls")
+
+server.shutdown()
@@ -0,0 +1,68 @@
+"""
+Benchmark ArbScanner on a synthetic full slate: every sport x N events x all
+BOOKMAKERS with h2h/spreads/totals, with some books deliberately off-market so
+arbs and middles exist.
+
+  python bench_scanner.py --events 16 --rounds 20
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--events", type=int, default=16, help="events per sport")
+ap.add_argument("--rounds", type=int, default=20)
+args = ap.parse_args()
+
+os.chdir(tempfile.mkdtemp())  # keep odds_log/history files out of the repo
+import app6  # noqa: E402
+
+
+def slate(rnd):
+    out = {}
+    for sport in app6.ALLOWED_SPORTS:
+        events = []
+        for i in range(args.events):
+            home, away = f"{sport} H{i}", f"{sport} A{i}"
+            line, total = rnd.choice([-7.5, -3.5, -2.5]), rnd.choice([41.5, 44.5, 47.5])
+            books = []
+            for b in app6.BOOKMAKERS:
+                shade = rnd.choice([0, 0, 0, 0.5, 1.0])
+                books.append({"key": b, "markets": [
+                    {"key": "h2h", "outcomes": [{"name": home, "price": rnd.randint(-170, -130)},
+                                                {"name": away, "price": rnd.randint(110, 160)}]},
+                    {"key": "spreads", "outcomes": [{"name": home, "price": -110, "point": line + shade},
+                                                    {"name": away, "price": -110, "point": -line - shade}]},
+                    {"key": "totals", "outcomes": [{"name": "Over", "price": rnd.choice([-115, -110, 100]), "point": total - shade},
+                                                   {"name": "Under", "price": rnd.choice([-115, -110, 100]), "point": total - shade}]},
+                ]})
+            events.append({"id": f"{sport}-{i}", "commence_time": "2030-01-01T00:00:00Z",
+                           "home_team": home, "away_team": away, "bookmakers": books})
+        out[sport] = events
+    return out
+
+
+rnd = random.Random(1)
+cold, warm = [], []
+for _ in range(args.rounds):
+    data = slate(rnd)
+    scanner = app6.ArbScanner()
+    t0 = time.perf_counter()
+    for sport, events in data.items():
+        scanner.update(sport, events)
+    res = scanner.results()
+    cold.append(time.perf_counter() - t0)
+    t0 = time.perf_counter()
+    for sport, events in data.items():
+        scanner.update(sport, events)
+    scanner.results()
+    warm.append(time.perf_counter() - t0)
+
+n_events = len(app6.ALLOWED_SPORTS) * args.events
+quotes = n_events * len(app6.BOOKMAKERS) * 6
+print(f"{n_events} events, {len(app6.BOOKMAKERS)} books, {quotes} quotes per slate")
+print(f"full scan      median {sorted(cold)[len(cold) // 2] * 1000:7.2f} ms")
+print(f"unchanged scan median {sorted(warm)[len(warm) // 2] * 1000:7.2f} ms")
+print(f"last slate: {len(res['arbs'])} arbs, {len(res['middles'])} middles")
@@ -0,0 +1,70 @@
+"""
+Memory benchmark: nested-dict records vs the columnar OddsSnapshot for a
+synthetic single-bookmaker payload (default 5,000 events x h2h/spreads/totals).
+
+  python bench_snapshot_memory.py --events 5000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+ap = argparse.ArgumentParser()
+ap.add_argument("--events", type=int, default=5000)
+args = ap.parse_args()
+
+workdir = tempfile.mkdtemp()
+os.chdir(workdir)  # keep odds_log/history files out of the repo
+import app6  # noqa: E402
+
+BOOK = "draftkings"
+
+
+def synthetic(n):
+    rnd = random.Random(7)
+    out = []
+    for i in range(n):
+        home, away = f"Home Team {i}", f"Away Team {i}"
+        sp = rnd.choice([-7.5, -3.5, -2.5, -1.5])
+        out.append({
+            "id": f"{i:032x}",
+            "commence_time": f"2025-09-{1 + i % 28:02d}T{i % 24:02d}:00:00Z",
+            "home_team": home,
+            "away_team": away,
+            "bookmakers": [{"key": BOOK, "markets": [
+                {"key": "h2h", "outcomes": [{"name": home, "price": rnd.randint(-250, -105)},
+                                            {"name": away, "price": rnd.randint(100, 220)}]},
+                {"key": "spreads", "outcomes": [{"name": home, "price": -110, "point": sp},
+                                                {"name": away, "price": -110, "point": -sp}]},
+                {"key": "totals", "outcomes": [{"name": "Over", "price": -110, "point": 44.5},
+                                               {"name": "Under", "price": -110, "point": 44.5}]},
+            ]}],
+        })
+    return out
+
+
+def measure(fn):
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    obj = fn()
+    dt = time.perf_counter() - t0
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, size, dt
+
+
+events = synthetic(args.events)
+store = app6.OpeningsStore(app6.JsonFileBackend(os.path.join(workdir, "openings.json")))
+# First pass records the openings and interns selection keys, so neither is counted below.
+warm = app6.build_snapshot(store, "bench", events, BOOK)
+warm.to_records()
+
+snap, snap_bytes, snap_s = measure(lambda: app6.build_snapshot(store, "bench", events, BOOK))
+records, rec_bytes, rec_s = measure(snap.to_records)
+
+print(f"{args.events} events, {len(snap)} selections")
+print(f"dict records   {rec_bytes / 1e6:8.2f} MB  ({rec_bytes / len(snap):6.0f} B/selection)  to_records {rec_s * 1000:7.1f} ms")
+print(f"OddsSnapshot   {snap_bytes / 1e6:8.2f} MB  ({snap_bytes / len(snap):6.0f} B/selection)  build      {snap_s * 1000:7.1f} ms")
+print(f"ratio          {rec_bytes / snap_bytes:8.1f}x")
@@ -4,9 +4,11 @@ from flask_cors import CORS
 from flask_talisman import Talisman
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
-import requests, json, pytz
+import requests, pytz
 from datetime import datetime
 
+from openings_db import OpeningsDB
+
 # Point Flask at your existing Templates/ folder
 app = Flask(__name__, template_folder="Templates")
 
@@ -27,7 +29,7 @@ CORS(app, origins=[
 API_KEY           = os.getenv("THE_ODDS_API_KEY")
 DEFAULT_BOOKMAKER = "draftkings"
 MARKETS           = ["h2h", "spreads", "totals"]
-ODDS_LOG_FILE     = "odds_log.json"
+ODDS_DB_FILE      = os.getenv("ODDS_DB_FILE", "odds_log.db")  # import_odds_log.py loads the old odds_log.json
 
 BOOKMAKERS = [
     {"key": "betonlineag", "title": "BetOnlineAg"},
@@ -43,17 +45,8 @@ SPORTS = [
     {"key": "americanfootball_ncaaf", "title": "NCAAF"}
 ]
 
-def load_odds_log():
-    if os.path.exists(ODDS_LOG_FILE):
-        try:
-            return json.load(open(ODDS_LOG_FILE))
-        except json.JSONDecodeError:
-            return {}
-    return {}
-
-def save_odds_log(log):
-    with open(ODDS_LOG_FILE, "w") as f:
-        json.dump(log, f, indent=2)
+# Opening lines, one SQLite row per selection (shared safely by all workers)
+openings = OpeningsDB(ODDS_DB_FILE)
 
 def decimal_to_american(d):
     if d >= 2.0:
@@ -75,7 +68,6 @@ def get_sports():
 @app.route("/odds/<sport>")
 def get_odds(sport):
     bookmaker = request.args.get("bookmaker", DEFAULT_BOOKMAKER)
-    odds_log  = load_odds_log()
 
     url = (
         f"https://api.the-odds-api.com/v4/sports/{sport}/odds"
@@ -87,7 +79,8 @@ def get_odds(sport):
         resp    = requests.get(url)
         resp.raise_for_status()
         data    = resp.json()
-        results = []
+        games   = []
+        rows    = []
 
         for game in data:
             home, away = game.get("home_team"), game.get("away_team")
@@ -100,14 +93,12 @@ def get_odds(sport):
             kickoff = dt.replace(tzinfo=pytz.utc).astimezone(pytz.timezone("US/Eastern"))
             kickoff_str = kickoff.strftime("%m/%d %I:%M %p")
 
-            odds_log.setdefault(sport, {}).setdefault(matchup, {})
-            all_markets = {}
-
             bk_list = game.get("bookmakers", [])
             bk_data = next((b for b in bk_list if b["key"] == bookmaker), None)
             if not bk_data:
                 continue
 
+            markets = []
             for m in bk_data.get("markets", []):
                 key = m["key"]
                 name = ("moneyline" if key=="h2h"
@@ -125,13 +116,22 @@ def get_odds(sport):
                     o["name"]: o["point"]
                     for o in m.get("outcomes", []) if o.get("point") is not None
                 }
+                markets.append((name, curr_price, curr_point))
 
-                # Save opening odds if first time
-                log_entry = odds_log[sport][matchup].setdefault(name, {"price": {}, "points": {}})
-                if not log_entry["price"]:
-                    log_entry["price"].update(curr_price)
-                    log_entry["points"].update(curr_point)
+                # Candidate openings; only selections not stored yet are written
+                for team in dict.fromkeys([*curr_price, *curr_point]):
+                    rows.append((matchup, name, team, curr_price.get(team), curr_point.get(team)))
 
+            games.append((matchup, kickoff_str, markets))
+
+        # One transaction for every new opening, one indexed read for these matchups
+        opened = openings.record_openings(sport, rows)
+        results = []
+
+        for matchup, kickoff_str, markets in games:
+            all_markets = {}
+            for name, curr_price, curr_point in markets:
+                log_entry      = opened.get((matchup, name), {"price": {}, "points": {}})
                 opening_price  = log_entry["price"]
                 opening_points = log_entry["points"]
 
@@ -156,7 +156,6 @@ def get_odds(sport):
                 "total":     all_markets.get("total",     {})
             })
 
-        save_odds_log(odds_log)
         return jsonify(results)
 
     except Exception as e:
@@ -0,0 +1,172 @@
+"""
+Minimal in-memory stand-in for the Upstash Redis REST API, for local runs and benchmarks.
+
+Supports the calls our apps make:
+  GET/POST /<cmd>/<arg>/...      e.g. /get/k, /setnx/k/v, /set/k (body = value)
+  POST /mget                     body = JSON list of keys (app.py / app7.py style)
+  POST /                         body = ["CMD", "arg", ...]
+  POST /pipeline, /multi-exec    body = [["CMD", ...], ...]
+
+EVAL is understood only for redis_client.COMPARE_AND_DELETE (lock release).
+
+With --backend redis://... it forwards every command to a real Redis instead
+of the in-memory dict (a local REST front end for transport benchmarks).
+
+Usage:
+  python fake_upstash.py --port 8079 --latency-ms 20
+  python fake_upstash.py --backend redis://127.0.0.1:6379/0
+  UPSTASH_REDIS_REST_URL=http://127.0.0.1:8079 UPSTASH_REDIS_REST_TOKEN=x python app6.py
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote
+
+from redis_client import COMPARE_AND_DELETE
+
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.commands = 0
+
+    def execute(self, cmd):
+        name, args = str(cmd[0]).upper(), [str(a) for a in cmd[1:]]
+        self.commands += 1
+        d = self.data
+        if name == "GET":
+            return d.get(args[0])
+        if name == "SET":
+            nx = any(a.upper() == "NX" for a in args[2:])
+            get = any(a.upper() == "GET" for a in args[2:])
+            old = d.get(args[0])
+            if nx and old is not None:
+                return old if get else None
+            d[args[0]] = args[1]
+            return old if get else "OK"
+        if name == "SETNX":
+            if args[0] in d:
+                return 0
+            d[args[0]] = args[1]
+            return 1
+        if name == "INCRBY":
+            d[args[0]] = str(int(d.get(args[0], 0)) + int(args[1]))
+            return int(d[args[0]])
+        if name == "EXPIRE":  # accepted but not enforced
+            return int(args[0] in d)
+        if name == "MGET":
+            return [d.get(k) for k in args]
+        if name == "DEL":
+            return sum(1 for k in args if d.pop(k, None) is not None)
+        if name == "EVAL" and args[0] == COMPARE_AND_DELETE:
+            if d.get(args[2]) == args[3]:
+                del d[args[2]]
+                return 1
+            return 0
+        if name == "EXISTS":
+            return sum(1 for k in args if k in d)
+        if name == "DBSIZE":
+            return len(d)
+        if name == "FLUSHALL":
+            d.clear()
+            return "OK"
+        raise ValueError(f"ERR unknown command '{name}'")
+
+    def run(self, cmd):
+        try:
+            with self.lock:
+                return {"result": self.execute(cmd)}
+        except Exception as e:
+            return {"error": str(e)}
+
+
+class ProxyRedis:
+    """Same interface as FakeRedis, backed by a real server via redis_client.NativeRedis."""
+    def __init__(self, url):
+        from redis_client import NativeRedis
+        self.native = NativeRedis(url)
+        self.calls = 0
+        self.commands = 0
+
+    def run(self, cmd):
+        self.commands += 1
+        try:
+            return self.native.pipeline([cmd])[0]
+        except Exception as e:
+            return {"error": str(e)}
+
+
+def make_handler(redis, latency: float):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, *args):
+            pass
+
+        def _reply(self, obj, status=200):
+            body = json.dumps(obj).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _handle(self, body):
+            redis.calls += 1
+            if latency:
+                time.sleep(latency)
+            parts = [unquote(p) for p in self.path.split("?", 1)[0].strip("/").split("/") if p]
+            if not parts:
+                cmd = json.loads(body)
+                out = redis.run(cmd)
+                return self._reply(out, 400 if "error" in out else 200)
+            if parts[0] in ("pipeline", "multi-exec"):
+                return self._reply([redis.run(c) for c in json.loads(body)])
+            if parts[0] == "mget" and len(parts) == 1 and body:
+                out = redis.run(["MGET"] + json.loads(body))
+                return self._reply(out)
+            cmd = parts
+            if body:
+                cmd = cmd + [body.decode("utf-8")]
+            if "?" in self.path and "nx=true" in self.path.split("?", 1)[1]:
+                cmd = cmd + ["NX"]
+            out = redis.run(cmd)
+            self._reply(out, 400 if "error" in out else 200)
+
+        def do_GET(self):
+            self._handle(b"")
+
+        def do_POST(self):
+            n = int(self.headers.get("Content-Length") or 0)
+            self._handle(self.rfile.read(n) if n else b"")
+
+    return Handler
+
+
+def serve(port: int = 0, latency_ms: float = 0.0, backend: str = None):
+    """Start the fake server on a background thread; returns (server, redis, base_url)."""
+    redis = ProxyRedis(backend) if backend else FakeRedis()
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(redis, latency_ms / 1000.0))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, redis, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8079)
+    ap.add_argument("--latency-ms", type=float, default=0.0)
+    ap.add_argument("--backend", default=None, help="redis:// URL to forward commands to")
+    a = ap.parse_args()
+    server, _, url = serve(a.port, a.latency_ms, a.backend)
+    print(f"fake upstash listening on {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
@@ -0,0 +1,21 @@
+"""
+One-shot import of odds_log.json (betkarma5's old whole-file log) into the
+SQLite openings store. Safe to re-run: rows already in the database are kept.
+
+  python import_odds_log.py                       # odds_log.json -> odds_log.db
+  python import_odds_log.py old_log.json odds.db
+"""
+import json
+import sys
+
+from openings_db import OpeningsDB
+
+src = sys.argv[1] if len(sys.argv) > 1 else "odds_log.json"
+dst = sys.argv[2] if len(sys.argv) > 2 else "odds_log.db"
+
+with open(src) as f:
+    log = json.load(f)
+
+db = OpeningsDB(dst)
+added = db.import_odds_log(log)
+print(f"imported {added} openings from {src} into {dst} ({len(db)} total)")
@@ -0,0 +1,187 @@
+"""
+Load test: Flask app6 vs app6_async against a local mock of The Odds API.
+
+Starts a mock upstream (fixed latency), launches each app as a subprocess
+pointed at it via ODDS_API_BASE, then drives /odds/<sport> with N concurrent
+clients for a fixed duration and reports p50/p99 latency and requests/sec.
+
+  python loadtest_odds.py --concurrency 200 --duration 15 --upstream-ms 300
+
+Flask runs under gunicorn (--flask-workers x --flask-threads) when it is
+installed, else the threaded werkzeug server. Caching is turned off so every
+request goes upstream: CACHE_SECONDS=0, ODDS_TTL_TIERS=0:0 and ODDS_TTL_IDLE=0
+zero every odds TTL, CACHE_MODE=strict refetches inline, SHARED_CACHE=off skips
+the cross-worker tier and DROP_STARTED_EVENTS=0 keeps the query string fixed.
+"""
+import argparse
+import asyncio
+import importlib.util
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+import aiohttp
+from aiohttp import web
+
+BOOKMAKERS = ["betonlineag", "draftkings", "fanduel", "caesars", "betmgm", "pointsbetus", "wynnbet"]
+SPORTS = ["americanfootball_nfl", "americanfootball_ncaaf", "baseball_mlb", "mma_mixed_martial_arts"]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def synthetic_events(sport: str, books, n: int):
+    rnd = random.Random(sport)
+    now = datetime.now(timezone.utc)
+    out = []
+    for i in range(n):
+        home, away = f"{sport} Home {i}", f"{sport} Away {i}"
+        sp = rnd.choice([-7.5, -3.5, -2.5, -1.5])
+        out.append({
+            "id": f"{sport}-{i:04d}",
+            "sport_key": sport,
+            "commence_time": (now + timedelta(hours=i + 1)).strftime("%Y-%m-%dT%H:%M:%SZ"),
+            "home_team": home,
+            "away_team": away,
+            "bookmakers": [{"key": b, "title": b, "markets": [
+                {"key": "h2h", "outcomes": [{"name": home, "price": rnd.randint(-250, -105)},
+                                            {"name": away, "price": rnd.randint(100, 220)}]},
+                {"key": "spreads", "outcomes": [{"name": home, "price": -110, "point": sp},
+                                                {"name": away, "price": -110, "point": -sp}]},
+                {"key": "totals", "outcomes": [{"name": "Over", "price": -110, "point": 44.5},
+                                               {"name": "Under", "price": -110, "point": 44.5}]},
+            ]} for b in books],
+        })
+    return out
+
+
+async def start_mock_upstream(port: int, latency: float, events_per_sport: int) -> web.AppRunner:
+    async def odds(request):
+        await asyncio.sleep(latency)
+        books = request.query.get("bookmakers", ",".join(BOOKMAKERS)).split(",")
+        return web.json_response(synthetic_events(request.match_info["sport"], books, events_per_sport))
+
+    async def sports(request):
+        return web.json_response([{"key": s, "active": True} for s in SPORTS])
+
+    app = web.Application()
+    app.router.add_get("/sports/{sport}/odds", odds)
+    app.router.add_get("/sports", sports)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", port).start()
+    return runner
+
+
+def launch(kind: str, port: int, upstream: str, workdir: str, args) -> subprocess.Popen:
+    env = dict(os.environ, API_KEY="loadtest", ODDS_API_BASE=upstream, PORT=str(port),
+               CACHE_SECONDS="0", CACHE_MODE="strict", ODDS_TTL_TIERS="0:0", ODDS_TTL_IDLE="0",
+               DROP_STARTED_EVENTS="0", SHARED_CACHE="off",
+               PYTHONPATH=os.path.dirname(os.path.abspath(__file__)))
+    env.pop("UPSTASH_REDIS_REST_URL", None)
+    if kind == "async":
+        cmd = [sys.executable, "-m", "app6_async"]
+    elif importlib.util.find_spec("gunicorn"):
+        cmd = [sys.executable, "-m", "gunicorn", "app6:app", "-b", f"127.0.0.1:{port}",
+               "-w", str(args.flask_workers), "--threads", str(args.flask_threads), "--log-level", "warning"]
+    else:
+        cmd = [sys.executable, "-c", f"import app6; app6.app.run(host='127.0.0.1', port={port}, threaded=True)"]
+    return subprocess.Popen(cmd, env=env, cwd=workdir, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+async def wait_up(url: str, timeout: float = 20.0):
+    deadline = time.time() + timeout
+    async with aiohttp.ClientSession() as s:
+        while time.time() < deadline:
+            try:
+                async with s.get(url + "/health") as r:
+                    if r.status == 200:
+                        return
+            except aiohttp.ClientError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"{url} did not come up")
+
+
+async def drive(url: str, concurrency: int, duration: float):
+    latencies, errors = [], 0
+    deadline = time.perf_counter() + duration
+    conn = aiohttp.TCPConnector(limit=concurrency)
+    async with aiohttp.ClientSession(connector=conn, timeout=aiohttp.ClientTimeout(total=60)) as s:
+        async def client(i: int):
+            nonlocal errors
+            rnd = random.Random(i)
+            while time.perf_counter() < deadline:
+                path = f"/odds/{rnd.choice(SPORTS)}?bookmaker={rnd.choice(BOOKMAKERS)}"
+                t0 = time.perf_counter()
+                try:
+                    async with s.get(url + path) as r:
+                        await r.read()
+                        ok = r.status == 200
+                except Exception:
+                    ok = False
+                if ok:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors += 1
+        t0 = time.perf_counter()
+        await asyncio.gather(*(client(i) for i in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+    return latencies, errors, elapsed
+
+
+def pct(values, p: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100.0 * (len(values) - 1))))]
+
+
+async def main(args):
+    upstream_port = free_port()
+    runner = await start_mock_upstream(upstream_port, args.upstream_ms / 1000.0, args.events)
+    upstream = f"http://127.0.0.1:{upstream_port}"
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:  # keeps odds_log.json out of the repo
+        for kind in args.apps:
+            port = free_port()
+            proc = launch(kind, port, upstream, workdir, args)
+            try:
+                await wait_up(f"http://127.0.0.1:{port}")
+                lat, errors, elapsed = await drive(f"http://127.0.0.1:{port}", args.concurrency, args.duration)
+            finally:
+                proc.terminate()
+                proc.wait(timeout=10)
+            results[kind] = {
+                "requests": len(lat),
+                "errors": errors,
+                "rps": round(len(lat) / elapsed, 1),
+                "p50_ms": round(pct(lat, 50) * 1000, 1),
+                "p99_ms": round(pct(lat, 99) * 1000, 1),
+                "mean_ms": round(statistics.fmean(lat) * 1000, 1) if lat else None,
+            }
+            print(f"{kind:6s} {json.dumps(results[kind])}")
+    await runner.cleanup()
+    return results
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=200)
+    ap.add_argument("--duration", type=float, default=15.0)
+    ap.add_argument("--upstream-ms", type=float, default=300.0)
+    ap.add_argument("--events", type=int, default=16)
+    ap.add_argument("--flask-workers", type=int, default=2)
+    ap.add_argument("--flask-threads", type=int, default=4)
+    ap.add_argument("--apps", nargs="+", default=["flask", "async"], choices=["flask", "async"])
+    asyncio.run(main(ap.parse_args()))
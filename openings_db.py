@@ -0,0 +1,123 @@
+"""
+SQLite store for opening lines (betkarma5.py).
+
+One row per (sport, matchup, market, selection), keyed on exactly that, so a
+request reads and writes only the rows for the games it is serving. Openings
+are insert-if-absent: the first price/point seen for a selection wins and is
+never overwritten, whichever worker got there first.
+
+The database runs in WAL mode, so readers never block the writer (and vice
+versa); writers queue on busy_timeout instead of failing. Connections are
+per thread, as sqlite3 connections must not be shared across threads.
+
+  db = OpeningsDB("odds_log.db")
+  opened = db.record_openings("baseball_mlb", [(matchup, market, selection, price, point), ...])
+  opened[(matchup, market)]  ->  {"price": {selection: price}, "points": {selection: point}}
+
+import_odds_log.py loads an existing odds_log.json into it.
+"""
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS openings (
+    sport      TEXT NOT NULL,
+    matchup    TEXT NOT NULL,
+    market     TEXT NOT NULL,
+    selection  TEXT NOT NULL,
+    price      TEXT,
+    point      REAL,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (sport, matchup, market, selection)
+) WITHOUT ROWID;
+"""
+
+# SQLite's default limit on bound parameters is 999 on older builds
+IN_CHUNK = 500
+
+Row = Tuple[str, str, str, Optional[str], Optional[float]]
+
+
+class OpeningsDB:
+    def __init__(self, path: str, busy_timeout_ms: int = 5000):
+        self.path = path
+        self.busy_timeout_ms = busy_timeout_ms
+        self._local = threading.local()
+        conn = self._conn()
+        conn.execute("PRAGMA journal_mode=WAL")
+        with conn:
+            conn.executescript(SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0)
+            conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+            # WAL + NORMAL: durable across app crashes, fsync only at checkpoints
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def insert_missing(self, sport: str, rows: Iterable[Row]) -> int:
+        """INSERT OR IGNORE (matchup, market, selection, price, point) rows in one
+        transaction. Returns how many were new."""
+        now = time.time()
+        params = [(sport, m, mk, sel, price, point, now) for m, mk, sel, price, point in rows]
+        if not params:
+            return 0
+        conn = self._conn()
+        with conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO openings (sport, matchup, market, selection, price, point, created_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                params,
+            )
+            return conn.total_changes - before
+
+    def openings(self, sport: str, matchups: Iterable[str]) -> Dict[Tuple[str, str], Dict[str, Dict[str, Any]]]:
+        """Stored openings for `matchups`, keyed by (matchup, market)."""
+        matchups = sorted(set(matchups))
+        out: Dict[Tuple[str, str], Dict[str, Dict[str, Any]]] = {}
+        conn = self._conn()
+        for i in range(0, len(matchups), IN_CHUNK):
+            chunk = matchups[i:i + IN_CHUNK]
+            cur = conn.execute(
+                "SELECT matchup, market, selection, price, point FROM openings"
+                f" WHERE sport = ? AND matchup IN ({','.join('?' * len(chunk))})",
+                [sport, *chunk],
+            )
+            for matchup, market, selection, price, point in cur:
+                entry = out.setdefault((matchup, market), {"price": {}, "points": {}})
+                if price is not None:
+                    entry["price"][selection] = price
+                if point is not None:
+                    entry["points"][selection] = point
+        return out
+
+    def record_openings(self, sport: str, rows: List[Row]) -> Dict[Tuple[str, str], Dict[str, Dict[str, Any]]]:
+        """Store any rows not seen before, then return the openings for every
+        matchup in `rows` (ours where we were first, else the stored ones)."""
+        self.insert_missing(sport, rows)
+        return self.openings(sport, (r[0] for r in rows))
+
+    def import_odds_log(self, log: Dict[str, Any]) -> int:
+        """Load the odds_log.json layout, sport -> matchup -> market ->
+        {"price": {selection: price}, "points": {selection: point}}. Existing
+        rows win. Returns how many rows were added."""
+        added = 0
+        for sport, games in log.items():
+            rows = []
+            for matchup, markets in (games or {}).items():
+                for market, entry in (markets or {}).items():
+                    prices = (entry or {}).get("price") or {}
+                    points = (entry or {}).get("points") or {}
+                    for selection in dict.fromkeys([*prices, *points]):
+                        rows.append((matchup, market, selection, prices.get(selection), points.get(selection)))
+            added += self.insert_missing(sport, rows)
+        return added
+
+    def __len__(self) -> int:
+        return self._conn().execute("SELECT COUNT(*) FROM openings").fetchone()[0]
@@ -0,0 +1,195 @@
+"""
+Openings storage adapter: one set of Redis operations over either transport.
+
+  NativeRedis  redis:// / rediss:// / unix:// URL, RESP over a pooled redis-py connection
+  RestRedis    Upstash REST endpoint + token, JSON over a pooled requests.Session
+
+Both expose get, mget, setnx, set, pipeline, delete_if_equal and get_or_set_many. pipeline()
+returns one {"result": ...} or {"error": ...} per command, in order, the shape
+the Upstash /pipeline endpoint uses, so callers handle either the same way.
+
+  client = make_redis_client(url, token, fallback_url)   # None when nothing is configured
+"""
+import abc
+import json
+import logging
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import redis
+except ImportError:  # optional: only needed for redis:// URLs
+    redis = None
+
+log = logging.getLogger("redis_client")
+
+NATIVE_SCHEMES = ("redis://", "rediss://", "unix://")
+# DEL KEYS[1] only while it still holds ARGV[1] (releasing a lock we own)
+COMPARE_AND_DELETE = ('if redis.call("GET", KEYS[1]) == ARGV[1] then '
+                      'return redis.call("DEL", KEYS[1]) else return 0 end')
+REDIS_POOL_SIZE = int(os.getenv("REDIS_POOL_SIZE", "50"))
+
+
+def _dumps(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
+class _RedisOps(abc.ABC):
+    kind = ""
+
+    @abc.abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abc.abstractmethod
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        ...
+
+    @abc.abstractmethod
+    def setnx(self, key: str, value: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def set(self, key: str, value: str) -> bool:
+        ...
+
+    @abc.abstractmethod
+    def pipeline(self, commands: List[List[Any]], transaction: bool = False) -> List[Dict[str, Any]]:
+        """One {"result": ...} or {"error": ...} per command, in order."""
+
+    def delete_if_equal(self, key: str, value: str) -> bool:
+        """Atomically delete `key` if its value is still `value`."""
+        reply = self.pipeline([["EVAL", COMPARE_AND_DELETE, 1, key, value]])[0]
+        if "error" in reply:
+            raise RuntimeError(reply["error"])
+        return reply.get("result") == 1
+
+    def get_or_set_many(self, entries: Sequence[Tuple[str, Optional[str]]]) -> List[Optional[str]]:
+        """One round trip: SET key value NX GET for each (key, value), or a plain
+        GET where value is None. Returns the stored value per key: the existing
+        one, else ours if our SET won. Needs Redis 7+ (Upstash supports it)."""
+        if not entries:
+            return []
+        commands = [["GET", k] if v is None else ["SET", k, v, "NX", "GET"] for k, v in entries]
+        out = []
+        for (_, value), reply in zip(entries, self.pipeline(commands)):
+            if "error" in reply:
+                out.append(None)
+            else:
+                stored = reply.get("result")
+                out.append(value if stored is None else stored)
+        return out
+
+
+class RestRedis(_RedisOps):
+    """Upstash Redis REST API."""
+    kind = "rest"
+
+    def __init__(self, url: str, token: str, timeout: float = 5.0, pool_size: int = REDIS_POOL_SIZE):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers["Authorization"] = f"Bearer {token}"
+        self.session.mount("https://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+        self.session.mount("http://", HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size))
+
+    def _command(self, *cmd: Any) -> Any:
+        r = self.session.post(self.url, data=_dumps(list(cmd)), timeout=self.timeout)
+        r.raise_for_status()
+        body = r.json()
+        if "error" in body:
+            raise RuntimeError(body["error"])
+        return body.get("result")
+
+    def get(self, key: str) -> Optional[str]:
+        return self._command("GET", key)
+
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        if not keys:
+            return []
+        return self._command("MGET", *keys) or [None] * len(keys)
+
+    def setnx(self, key: str, value: str) -> bool:
+        return self._command("SETNX", key, value) == 1
+
+    def set(self, key: str, value: str) -> bool:
+        return self._command("SET", key, value) == "OK"
+
+    def pipeline(self, commands: List[List[Any]], transaction: bool = False) -> List[Dict[str, Any]]:
+        r = self.session.post(
+            f"{self.url}/{'multi-exec' if transaction else 'pipeline'}",
+            data=_dumps(commands),
+            timeout=max(self.timeout, 10.0),
+        )
+        r.raise_for_status()
+        out = r.json()
+        if not isinstance(out, list) or len(out) != len(commands):
+            raise ValueError(f"pipeline returned {len(out) if isinstance(out, list) else out!r} results")
+        return out
+
+
+class NativeRedis(_RedisOps):
+    """RESP over a redis-py connection pool."""
+    kind = "native"
+
+    def __init__(self, url: str, timeout: float = 5.0, pool_size: int = REDIS_POOL_SIZE):
+        pool = redis.BlockingConnectionPool.from_url(
+            url,
+            max_connections=pool_size,
+            timeout=timeout,
+            socket_timeout=timeout,
+            socket_connect_timeout=timeout,
+            health_check_interval=30,
+            decode_responses=True,
+        )
+        self.client = redis.Redis(connection_pool=pool)
+
+    def get(self, key: str) -> Optional[str]:
+        return self.client.get(key)
+
+    def mget(self, keys: List[str]) -> List[Optional[str]]:
+        return self.client.mget(keys) if keys else []
+
+    def setnx(self, key: str, value: str) -> bool:
+        return bool(self.client.setnx(key, value))
+
+    def set(self, key: str, value: str) -> bool:
+        return bool(self.client.set(key, value))
+
+    def pipeline(self, commands: List[List[Any]], transaction: bool = False) -> List[Dict[str, Any]]:
+        pipe = self.client.pipeline(transaction=transaction)
+        for cmd in commands:
+            # get=True makes redis-py hand back SET ... GET replies instead of a bool
+            get = str(cmd[0]).upper() == "SET" and any(str(a).upper() == "GET" for a in cmd[3:])
+            pipe.execute_command(*cmd, **({"get": True} if get else {}))
+        replies = pipe.execute(raise_on_error=False)
+        return [{"error": str(r)} if isinstance(r, Exception) else {"result": _rest_shape(cmd, r)}
+                for cmd, r in zip(commands, replies)]
+
+
+def _rest_shape(cmd: List[Any], reply: Any) -> Any:
+    """redis-py turns some integer/status replies into bools; give them back
+    the values the REST API returns (SETNX -> 0/1, SET -> "OK")."""
+    if isinstance(reply, bool):
+        if str(cmd[0]).upper() == "SET":
+            return "OK" if reply else None
+        return int(reply)
+    return reply
+
+
+def make_redis_client(url: Optional[str], token: Optional[str] = None,
+                      fallback_url: Optional[str] = None) -> Optional[_RedisOps]:
+    """NativeRedis for a redis:// style `url`, RestRedis for an http(s) one
+    (needs `token`). If the native client cannot be used (redis-py missing),
+    falls back to REST at `fallback_url`. None when nothing usable is configured."""
+    if url and url.startswith(NATIVE_SCHEMES):
+        if redis is not None:
+            return NativeRedis(url)
+        log.warning("redis-py not installed; falling back to the REST client")
+        url = fallback_url
+    if url and token and not url.startswith(NATIVE_SCHEMES):
+        return RestRedis(url, token)
+    return None
@@ -5,6 +5,8 @@ document.addEventListener("DOMContentLoaded", function () {
 
     let currentSport = null;
     let currentBookmaker = null;
+    // Live updates only when the server has streaming turned on
+    let streamEnabled = false;
 
     // Map API sport keys to friendly names
     const SPORT_NAMES = {
@@ -53,6 +55,7 @@ document.addEventListener("DOMContentLoaded", function () {
                 if (data.default) {
                     bookmakerSelect.value = data.default;
                 }
+                streamEnabled = !!data.stream;
                 currentBookmaker = bookmakerSelect.value;
             }
         })
@@ -73,14 +76,17 @@ document.addEventListener("DOMContentLoaded", function () {
     function loadOdds() {
         if (!currentSport || !currentBookmaker) return;
         oddsContainer.innerHTML = `<p>Loading odds for ${friendlySportName(currentSport)} (${currentBookmaker})...</p>`;
-        fetch(`/odds/${currentSport}?bookmaker=${currentBookmaker}`)
+        // no-cache: revalidate with If-None-Match; unchanged odds come back as 304
+        fetch(`/odds/${currentSport}?bookmaker=${currentBookmaker}`, { cache: "no-cache" })
             .then((res) => res.json())
             .then((data) => {
                 if (!data.records || data.records.length === 0) {
                     oddsContainer.innerHTML = `<p>No games found for ${friendlySportName(currentSport)}</p>`;
                     return;
                 }
-                renderOdds(data.records);
+                currentRecords = data.records;
+                renderOdds(currentRecords);
+                openStream();
             })
             .catch((err) => {
                 console.error("Error loading odds:", err);
@@ -88,6 +94,39 @@ document.addEventListener("DOMContentLoaded", function () {
             });
     }
 
+    // Live line moves over Server-Sent Events
+    let currentRecords = [];
+    let stream = null;
+
+    function openStream() {
+        if (stream) stream.close();
+        stream = null;
+        if (!streamEnabled || !window.EventSource) return;
+        stream = new EventSource(`/stream/odds/${currentSport}?bookmaker=${currentBookmaker}`);
+        // Server closes each stream after a while and the browser reconnects;
+        // a refusal (503: disabled or at capacity) leaves it CLOSED, so stop there
+        const es = stream;
+        es.onerror = () => {
+            if (es.readyState === EventSource.CLOSED && stream === es) stream = null;
+        };
+        stream.addEventListener("snapshot", (e) => {
+            currentRecords = JSON.parse(e.data).records || [];
+            renderOdds(currentRecords);
+        });
+        stream.addEventListener("moves", (e) => {
+            const byId = {};
+            currentRecords.forEach((r) => { byId[r.event_id] = r; });
+            JSON.parse(e.data).moves.forEach((m) => {
+                const rec = byId[m.event_id];
+                if (!rec) return;
+                const { event_id, market, selection, ...entry } = m;
+                rec[market] = rec[market] || {};
+                rec[market][selection] = entry;
+            });
+            renderOdds(currentRecords);
+        });
+    }
+
     // Render odds
     function renderOdds(records) {
         oddsContainer.innerHTML = "";
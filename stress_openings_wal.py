@@ -0,0 +1,85 @@
+"""
+Stress the openings WAL across processes: several workers flush small batches
+from two threads each, with WAL_COMPACT_LINES low enough that background
+compactions keep overlapping the flushes. Fails (exit 1) if any worker hangs
+or if a fresh load does not see every opening written.
+
+  python stress_openings_wal.py --procs 3 --keys 3000 --batch 10 --compact-after 200
+"""
+import argparse
+import multiprocessing as mp
+import os
+import sys
+import tempfile
+import threading
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def worker(root: str, wid: int, keys: int, batch: int, compact_after: int):
+    os.chdir(root)  # keep odds_log/history files out of the repo
+    sys.path.insert(0, HERE)
+    import app6
+
+    backend = app6.WalFileBackend(os.path.join(root, "odds_log.json"), compact_after=compact_after)
+    backend.load()
+
+    def flush(tid: int):
+        for i in range(0, keys // 2, batch):
+            backend.write({f"open:stress:{wid}-{tid}-{j}:h2h:team:book": {"opening_price": -110}
+                           for j in range(i, min(i + batch, keys // 2))}, {})
+
+    threads = [threading.Thread(target=flush, args=(t,)) for t in range(2)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    while backend._compacting:
+        time.sleep(0.05)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--procs", type=int, default=3)
+    ap.add_argument("--keys", type=int, default=3000, help="openings per process")
+    ap.add_argument("--batch", type=int, default=10)
+    ap.add_argument("--compact-after", type=int, default=200)
+    ap.add_argument("--timeout", type=float, default=60.0)
+    args = ap.parse_args()
+
+    root = tempfile.mkdtemp()
+    ctx = mp.get_context("spawn")
+    procs = [ctx.Process(target=worker, args=(root, w, args.keys, args.batch, args.compact_after))
+             for w in range(args.procs)]
+    t0 = time.time()
+    for p in procs:
+        p.start()
+    deadline = t0 + args.timeout
+    for p in procs:
+        p.join(max(0.0, deadline - time.time()))
+    hung = [p.pid for p in procs if p.is_alive()]
+    for p in procs:
+        if p.is_alive():
+            p.kill()
+    if hung:
+        print(f"FAIL: workers {hung} still running after {args.timeout:.0f}s (deadlock?)")
+        sys.exit(1)
+    if any(p.exitcode for p in procs):
+        print(f"FAIL: worker exit codes {[p.exitcode for p in procs]}")
+        sys.exit(1)
+
+    os.chdir(root)
+    sys.path.insert(0, HERE)
+    import app6
+    data = app6.WalFileBackend(os.path.join(root, "odds_log.json")).load()
+    expected = args.procs * (args.keys // 2) * 2
+    print(f"{args.procs} procs, {expected} openings in {time.time() - t0:.1f}s; loaded {len(data)}")
+    if len(data) != expected:
+        print("FAIL: openings lost")
+        sys.exit(1)
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()